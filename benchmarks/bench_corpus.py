@@ -0,0 +1,51 @@
+import argparse
+import time
+
+import networkx as nx
+
+from gym_maze.envs.maze_corpus import MazeIndex
+from gym_maze.envs.maze_evaluation import build_maze, random_tasks
+
+
+def networkx_lengths(tasks):
+    # the solution lengths the way they were computed before, one graph per maze
+    lengths = []
+    for task in tasks:
+        maze = build_maze(task)
+        goal = (maze.MAZE_W - 1, maze.MAZE_H - 1)
+        lengths.append(nx.shortest_path_length(maze.G, (0, 0), goal))
+    return lengths
+
+
+if __name__ == "__main__":
+
+    parser = argparse.ArgumentParser(description="Time the indexing of a corpus of mazes.")
+    parser.add_argument("--mazes", type=int, default=2000)
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--chunk-size", type=int, default=256)
+    args = parser.parse_args()
+
+    # perfect mazes, where the networkx lengths are the shortest paths too
+    tasks = random_tasks(args.mazes, modes=(None,))
+
+    start = time.perf_counter()
+    index = MazeIndex.build(tasks, num_workers=args.workers, chunk_size=args.chunk_size)
+    elapsed = time.perf_counter() - start
+    print("indexed %d mazes in %.2f s" % (len(index), elapsed))
+
+    start = time.perf_counter()
+    lengths = networkx_lengths(tasks)
+    elapsed = time.perf_counter() - start
+    print("networkx solution lengths in %.2f s" % elapsed)
+    assert list(index["shortest_path"]) == lengths
+
+    start = time.perf_counter()
+    for _ in range(1000):
+        rows = index.query(shortest_path=(20, 40), dead_ends=(None, 60))
+    elapsed = time.perf_counter() - start
+    print("query: %d mazes in %.1f us" % (len(rows), elapsed * 1000))
+
+    start = time.perf_counter()
+    sample = index.sample(10000, weights="shortest_path", rows=rows)
+    elapsed = time.perf_counter() - start
+    print("weighted sample of 10000 in %.2f ms" % (elapsed * 1000))
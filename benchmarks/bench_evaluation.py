@@ -0,0 +1,72 @@
+import argparse
+import time
+
+import numpy as np
+
+from gym_maze.envs.maze_env import MazeEnv
+from gym_maze.envs.maze_evaluation import evaluate, random_tasks, sample_tasks, summarize
+from gym_maze.envs.maze_observation import LocalWalls
+from gym_maze.envs.maze_view_2d import Maze
+
+
+class WallFollower:
+    """Keeps its right hand on the wall, given LocalWalls(1) observations.
+    """
+
+    def __init__(self):
+        self.headings = None
+        compass = list(Maze.COMPASS.keys())
+        self.actions = np.array([MazeEnv.ACTION.index(d) for d in compass])
+
+    def reset(self, batch_size):
+        # start facing south
+        self.headings = np.full(batch_size, 2)
+
+    def __call__(self, observations):
+        walls = observations.reshape(len(observations))
+        # back, left, straight then right in COMPASS order N, E, S, W: the last open one wins
+        headings = self.headings.copy()
+        for turn in (2, 3, 0, 1):
+            d = (self.headings + turn) % 4
+            headings = np.where((walls >> d) & 1, d, headings)
+        self.headings = headings
+        return self.actions[headings]
+
+
+def run(tasks, num_workers, chunk_size):
+    start = time.perf_counter()
+    results = list(
+        evaluate(
+            WallFollower(),
+            tasks,
+            num_workers=num_workers,
+            chunk_size=chunk_size,
+            observation=LocalWalls(1),
+        )
+    )
+    return time.perf_counter() - start, summarize(results)
+
+
+if __name__ == "__main__":
+
+    parser = argparse.ArgumentParser(description="Time the evaluation of a policy on a suite.")
+    parser.add_argument("--mazes", type=int, default=2000)
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--chunk-size", type=int, default=256)
+    parser.add_argument(
+        "--plus",
+        action="store_true",
+        help="add mazes with loops and portals, where the wall follower can circle until the "
+        "step limit",
+    )
+    args = parser.parse_args()
+
+    modes = (None, "plus") if args.plus else (None,)
+    tasks = sample_tasks() + random_tasks(args.mazes, modes=modes)
+
+    # compile the numba kernels before timing, the forked workers of the pool inherit them
+    run(random_tasks(2 * len(modes) * 3, modes=modes), 0, args.chunk_size)
+
+    for name, workers in (("in process", 0), ("process pool", args.workers)):
+        elapsed, summary = run(tasks, workers, args.chunk_size)
+        print("%-13s %7.2f s   %s" % (name, elapsed, summary))
@@ -0,0 +1,73 @@
+import argparse
+import time
+
+import numpy as np
+
+from gym_maze.envs import maze_kernels
+from gym_maze.envs.maze_view_2d import Maze
+
+
+def best_time(func, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def benchmark(size, repeat, batch):
+    width, height = size
+    num_breaks = int(round(width * height * 0.2))
+    maze = Maze(maze_size=size, has_loops=True, rand_break=0.2, seed=0)
+    goal = [maze.num_cells - 1]
+    rng = np.random.default_rng(0)
+    cells = rng.integers(0, maze.num_cells, batch)
+    dirs = rng.integers(0, 4, batch)
+
+    kernels = {
+        "generate": lambda: maze_kernels.generate_maze(size, 1, num_breaks),
+        "bfs": lambda: maze_kernels.bfs(maze.transitions, goal),
+        "step x%d" % batch: lambda: maze_kernels.step_cells(maze.transitions, cells, dirs),
+    }
+
+    results = dict()
+    for backend in maze_kernels.BACKENDS:
+        try:
+            maze_kernels.set_backend(backend)
+        except ImportError:
+            print("%s backend unavailable, skipping." % backend)
+            continue
+        for name, func in kernels.items():
+            # the first call compiles the numba kernels
+            func()
+            results[backend, name] = best_time(func, repeat)
+
+    print("maze %d x %d" % size)
+    for name in kernels:
+        if ("numpy", name) not in results or ("numba", name) not in results:
+            continue
+        numpy_time, numpy_out = results["numpy", name]
+        numba_time, numba_out = results["numba", name]
+        print(
+            "  %-12s numpy %9.3f ms   numba %9.3f ms   speedup %6.1fx   identical %s"
+            % (
+                name,
+                numpy_time * 1e3,
+                numba_time * 1e3,
+                numpy_time / numba_time,
+                np.array_equal(numpy_out, numba_out),
+            )
+        )
+
+
+if __name__ == "__main__":
+
+    parser = argparse.ArgumentParser(description="Compare the numpy and numba maze kernels.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10, 100, 300])
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--batch", type=int, default=100000)
+    args = parser.parse_args()
+
+    for size in args.sizes:
+        benchmark((size, size), args.repeat, args.batch)
@@ -0,0 +1,75 @@
+import argparse
+import time
+
+import numpy as np
+
+from gym_maze.envs import maze_kernels
+from gym_maze.envs.maze_env import MazeEnv
+from gym_maze.envs.maze_planner import HierarchicalPlanner
+
+
+def mean_time(func, queries):
+    start = time.perf_counter()
+    results = [func(s, g) for s, g in queries]
+    return (time.perf_counter() - start) / len(queries), results
+
+
+def benchmark(size, num_queries, cluster_size, nx_max_size):
+    env = MazeEnv(maze_size=size, mode="plus", enable_render=False)
+    maze = env.maze_view.maze
+    rng = np.random.default_rng(0)
+    queries = [maze.index_to_cell(rng.integers(0, maze.num_cells, 2)) for _ in range(num_queries)]
+
+    start = time.perf_counter()
+    planner = HierarchicalPlanner(maze, cluster_size)
+    build_time = time.perf_counter() - start
+
+    def flat_bfs(s, g):
+        return maze_kernels.bfs(maze.transitions, [maze.cell_to_index(g)])[maze.cell_to_index(s)]
+
+    def k_shortest(s, g):
+        env.maze_view.set_entrance(s)
+        env.maze_view.set_goal(g)
+        return env.k_shortest_paths(1)
+
+    planner.shortest_path(*queries[0])
+    results = {
+        "hierarchical distance": mean_time(planner.distance, queries),
+        "hierarchical path": mean_time(planner.shortest_path, queries),
+        "flat bfs distance": mean_time(flat_bfs, queries),
+    }
+    if max(size) <= nx_max_size:
+        results["k_shortest_paths(1)"] = mean_time(k_shortest, queries)
+
+    print(
+        "maze %d x %d: %d clusters, %d abstract nodes, %d edges, built in %.3f s"
+        % (size + (planner.num_clusters, planner.num_nodes, planner.num_edges, build_time))
+    )
+    for name, (latency, _) in results.items():
+        print("  %-22s %10.3f ms / query" % (name, latency * 1e3))
+    _, distances = results["hierarchical distance"]
+    _, reference = results["flat bfs distance"]
+    print("  distances identical to bfs: %s" % np.array_equal(distances, reference))
+
+
+if __name__ == "__main__":
+
+    parser = argparse.ArgumentParser(
+        description="Query latency of the hierarchical planner against flat search."
+    )
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100, 300, 1000])
+    parser.add_argument("--queries", type=int, default=50)
+    parser.add_argument("--cluster-size", type=int, default=32)
+    parser.add_argument(
+        "--nx-max-size",
+        type=int,
+        default=300,
+        help="largest maze side on which to run the networkx k_shortest_paths",
+    )
+    args = parser.parse_args()
+
+    # compile the numba kernels before timing
+    HierarchicalPlanner(MazeEnv(maze_size=(8, 8), enable_render=False).maze_view.maze, 4)
+
+    for size in args.sizes:
+        benchmark((size, size), args.queries, args.cluster_size, args.nx_max_size)
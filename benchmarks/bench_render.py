@@ -0,0 +1,68 @@
+import argparse
+import time
+
+import numpy as np
+import pygame
+
+from gym_maze.envs.maze_render import MazeRenderer, colourize
+from gym_maze.envs.maze_view_2d import Maze
+
+
+def best_time(func, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def benchmark(size, cell_size, num_robots, num_frames, repeat):
+    maze = Maze(maze_size=size, seed=0)
+    renderer = MazeRenderer(maze, cell_size=cell_size)
+    rng = np.random.default_rng(0)
+    heatmaps = rng.random((num_frames,) + size)
+    positions = rng.integers(0, min(size), (num_frames, num_robots, 2))
+
+    # the same heatmap drawn with one pygame.draw.rect call per cell
+    surface = pygame.surfarray.make_surface(renderer.image.swapaxes(0, 1))
+    colours = colourize(heatmaps[0]).astype(np.uint8).tolist()
+
+    def draw_rects():
+        for x in range(size[0]):
+            for y in range(size[1]):
+                rect = (x * cell_size + 1, y * cell_size + 1, cell_size - 1, cell_size - 1)
+                pygame.draw.rect(surface, colours[x][y], rect)
+
+    with_robots = "frame(heatmap, %d robots)" % num_robots
+    times = {
+        "pygame.draw.rect per cell": best_time(draw_rects, repeat),
+        "frame(heatmap)": best_time(lambda: renderer.frame(heatmap=heatmaps[0]), repeat),
+        with_robots: best_time(
+            lambda: renderer.frame(heatmap=heatmaps[0], positions=positions[0]), repeat
+        ),
+        "frames(), per frame": best_time(lambda: renderer.frames(heatmaps, positions), repeat)
+        / num_frames,
+        "iter_frames(), per frame": best_time(
+            lambda: [None for _ in renderer.iter_frames(heatmaps, positions)], repeat
+        )
+        / num_frames,
+    }
+
+    print("maze %d x %d, cell size %d" % (size + (cell_size,)))
+    for name, elapsed in times.items():
+        print("  %-28s %8.2f ms" % (name, elapsed * 1e3))
+
+
+if __name__ == "__main__":
+
+    parser = argparse.ArgumentParser(description="Time heatmap frames of the NumPy renderer.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10, 100])
+    parser.add_argument("--cell-size", type=int, default=8)
+    parser.add_argument("--robots", type=int, default=100)
+    parser.add_argument("--frames", type=int, default=50)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    for size in args.sizes:
+        benchmark((size, size), args.cell_size, args.robots, args.frames, args.repeat)
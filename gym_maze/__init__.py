@@ -74,3 +74,17 @@ register(
     max_episode_steps=1000000,
     nondeterministic=True,
 )
+
+register(
+    id="maze-random-10x10x10-v0",
+    entry_point="gym_maze.envs:MazeNDEnvRandom10x10x10",
+    max_episode_steps=100000,
+    nondeterministic=True,
+)
+
+register(
+    id="maze-random-50x50x50-v0",
+    entry_point="gym_maze.envs:MazeNDEnvRandom50x50x50",
+    max_episode_steps=10000000,
+    nondeterministic=True,
+)
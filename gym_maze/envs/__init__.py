@@ -1,2 +1,49 @@
 from gym_maze.envs.maze_env import *
 from gym_maze.envs.maze_view_2d import MazeView2D
+from gym_maze.envs.maze_reward import (
+    RewardSpec,
+    RewardTable,
+    CompositeReward,
+    GoalReward,
+    CellReward,
+    PotentialShaping,
+    NoveltyBonus,
+)
+from gym_maze.envs.maze_sampling import StartGoalSampler, FixedStartGoal, DistanceBandSampler
+from gym_maze.envs.maze_observation import (
+    KNOWN,
+    ObservationSpec,
+    LocalWalls,
+    LineOfSight,
+    ExploredMap,
+)
+from gym_maze.envs.maze_multi_agent import MultiAgentMazeEnv
+from gym_maze.envs.maze_render import MazeRenderer, colourize
+from gym_maze.envs.maze_display import MazeDisplay
+from gym_maze.envs.maze_junctions import JunctionGraph
+from gym_maze.envs.maze_planner import HierarchicalPlanner
+from gym_maze.envs.maze_nd import MazeND
+from gym_maze.envs.maze_nd_env import MazeNDEnv, MazeNDEnvRandom10x10x10, MazeNDEnvRandom50x50x50
+from gym_maze.envs.maze_evaluation import (
+    MazeTask,
+    EpisodeResult,
+    sample_tasks,
+    random_tasks,
+    run_tasks,
+    evaluate,
+    summarize,
+)
+from gym_maze.envs.maze_corpus import (
+    METRICS,
+    MazeIndex,
+    maze_metrics,
+    directory_tasks,
+    index_directory,
+)
+from gym_maze.envs.maze_dynamics import (
+    TransitionModel,
+    DynamicsSpec,
+    Slip,
+    ActionNoise,
+    Wind,
+)
@@ -0,0 +1,274 @@
+import multiprocessing
+import os
+
+import numpy as np
+
+from gym_maze.envs import maze_kernels
+from gym_maze.envs.maze_view_2d import Maze
+from gym_maze.envs.maze_evaluation import MazeTask, build_maze
+
+# The file of the index of a directory of mazes, saved next to them.
+INDEX_FILE = "maze_index.npz"
+
+# The difficulty metrics of a maze, in the column order of MazeIndex.
+METRICS = (
+    "width",
+    "height",
+    "num_cells",
+    "num_portals",
+    "shortest_path",
+    "dead_ends",
+    "junctions",
+    "loops",
+    "portal_shortcut",
+)
+
+
+def directory_tasks(directory):
+    """A MazeTask for every maze file (.npy) of a directory.
+    """
+    return [
+        MazeTask(os.path.splitext(name)[0], os.path.join(directory, name), None, None, None)
+        for name in sorted(os.listdir(directory))
+        if name.endswith(".npy")
+    ]
+
+
+def maze_metrics(mazes):
+    """Computes the METRICS of a list of mazes at once, as a dict of arrays with a row per maze.
+
+    The tables of the mazes are stacked into one graph, so every metric is a few array
+    operations or breadth-first searches over the whole batch:
+
+    - shortest_path: moves from the entrance (0, 0) to the goal in the opposite corner,
+      through portals (-1 if unreachable);
+    - dead_ends and junctions: cells with one open wall, and with three or more;
+    - loops: independent cycles of the walls, open walls - cells + connected parts (0 for a
+      perfect maze);
+    - portal_shortcut: moves saved by the portals on the shortest path (0 without portals or
+      if the goal cannot be reached without them).
+    """
+    num_mazes = len(mazes)
+    sizes = np.array([maze.num_cells for maze in mazes], dtype=np.int64)
+    offsets = np.concatenate([[0], np.cumsum(sizes)[:-1]]).astype(np.int64)
+    maze_of = np.repeat(np.arange(num_mazes), sizes)
+
+    directions = np.array(list(Maze.COMPASS.values()))
+    open_walls = np.concatenate([maze.open_walls.reshape(-1, len(directions)) for maze in mazes])
+    transitions = np.concatenate([maze.transitions + o for maze, o in zip(mazes, offsets)])
+    # the same moves without the jumps through portals
+    walls = np.concatenate(
+        [
+            np.where(
+                maze.open_walls.reshape(-1, len(directions)),
+                maze_kernels.neighbour_table(maze.maze_size, directions),
+                np.arange(maze.num_cells)[:, None],
+            )
+            + o
+            for maze, o in zip(mazes, offsets)
+        ]
+    )
+
+    degree = open_walls.sum(axis=1)
+    starts = offsets
+    goals = offsets + sizes - 1
+    shortest = maze_kernels.bfs(transitions, goals)[starts]
+    without_portals = maze_kernels.bfs(walls, goals)
+
+    # connected parts, one search per part from the first cell of each maze not reached yet
+    parts = np.ones(num_mazes, dtype=np.int64)
+    reached = without_portals >= 0
+    while not reached.all():
+        left = np.flatnonzero(~reached)
+        seeds = left[np.unique(maze_of[left], return_index=True)[1]]
+        parts[maze_of[seeds]] += 1
+        reached |= maze_kernels.bfs(walls, seeds) >= 0
+
+    without_portals = without_portals[starts]
+    shortcut = np.where((shortest >= 0) & (without_portals >= 0), without_portals - shortest, 0)
+    num_walls = np.bincount(maze_of, weights=degree, minlength=num_mazes).astype(np.int64) // 2
+    return dict(
+        width=np.array([maze.MAZE_W for maze in mazes], dtype=np.int64),
+        height=np.array([maze.MAZE_H for maze in mazes], dtype=np.int64),
+        num_cells=sizes,
+        num_portals=np.array([len(maze.portals) for maze in mazes], dtype=np.int64),
+        shortest_path=shortest,
+        dead_ends=np.bincount(maze_of, weights=degree == 1, minlength=num_mazes).astype(np.int64),
+        junctions=np.bincount(maze_of, weights=degree >= 3, minlength=num_mazes).astype(np.int64),
+        loops=num_walls - sizes + parts,
+        portal_shortcut=shortcut,
+    )
+
+
+def _task_metrics(tasks):
+    return maze_metrics([build_maze(task) for task in tasks])
+
+
+class MazeIndex:
+    """A columnar index of the difficulty METRICS of a corpus of mazes.
+
+    Each column is an array with a row per MazeTask. ``query`` selects the rows within ranges
+    of any columns, starting from a binary search in the cached sorted order of the first
+    column, and ``sample`` draws rows with weights such as a column. The index is saved as an
+    .npz file of columns, by default next to the maze files of a directory (see
+    index_directory).
+    """
+
+    def __init__(self, tasks, columns):
+        self.tasks = list(tasks)
+        self.columns = {name: np.asarray(values) for name, values in columns.items()}
+        for name, values in self.columns.items():
+            if len(values) != len(self.tasks):
+                raise ValueError("Column %s must have one row per task." % name)
+        self.__orders = dict()
+
+    @classmethod
+    def build(cls, tasks, num_workers=None, chunk_size=256, context=None):
+        """Computes the metrics of every task with maze_metrics, in chunks over a process pool.
+
+        num_workers defaults to all the CPUs; with num_workers=0 everything runs in this
+        process.
+        """
+        tasks = list(tasks)
+        chunks = [tasks[i : i + chunk_size] for i in range(0, len(tasks), chunk_size)]
+        if num_workers == 0 or len(chunks) <= 1:
+            results = [_task_metrics(chunk) for chunk in chunks]
+        else:
+            pool = multiprocessing.get_context(context).Pool(num_workers)
+            try:
+                results = pool.map(_task_metrics, chunks)
+            finally:
+                pool.terminate()
+                pool.join()
+        columns = {
+            name: np.concatenate([r[name] for r in results] or [np.zeros(0, np.int64)])
+            for name in METRICS
+        }
+        return cls(tasks, columns)
+
+    def save(self, file_path):
+        """Saves the tasks and the columns as arrays of an .npz file.
+        """
+        if not os.path.exists(os.path.dirname(os.path.abspath(file_path))):
+            raise ValueError("Cannot find the directory for %s." % file_path)
+        maze_sizes = [task.maze_size or (0, 0) for task in self.tasks]
+        np.savez(
+            file_path,
+            task_name=np.array([task.name for task in self.tasks], dtype=str),
+            task_maze_file=np.array([task.maze_file or "" for task in self.tasks], dtype=str),
+            task_maze_size=np.array(maze_sizes, dtype=np.int64).reshape(-1, 2),
+            task_mode=np.array([task.mode or "" for task in self.tasks], dtype=str),
+            task_seed=np.array([-1 if task.seed is None else task.seed for task in self.tasks]),
+            **{"column_" + name: values for name, values in self.columns.items()}
+        )
+
+    @classmethod
+    def load(cls, file_path):
+        """Loads an index saved by save.
+
+        Maze files are looked up next to the index first, so a corpus can be moved with it.
+        """
+        directory = os.path.dirname(os.path.abspath(file_path))
+        with np.load(file_path, allow_pickle=False) as data:
+            tasks = []
+            for name, maze_file, maze_size, mode, seed in zip(
+                data["task_name"],
+                data["task_maze_file"],
+                data["task_maze_size"],
+                data["task_mode"],
+                data["task_seed"],
+            ):
+                maze_file = str(maze_file) or None
+                if maze_file:
+                    moved = os.path.join(directory, os.path.basename(maze_file))
+                    maze_file = moved if os.path.exists(moved) else maze_file
+                tasks.append(
+                    MazeTask(
+                        str(name),
+                        maze_file,
+                        None if maze_file else tuple(int(n) for n in maze_size),
+                        str(mode) or None,
+                        None if seed < 0 else int(seed),
+                    )
+                )
+            columns = {
+                key[len("column_") :]: data[key] for key in data.files if key.startswith("column_")
+            }
+        return cls(tasks, columns)
+
+    def __len__(self):
+        return len(self.tasks)
+
+    def __getitem__(self, name):
+        return self.columns[name]
+
+    def __order(self, name):
+        if name not in self.__orders:
+            self.__orders[name] = np.argsort(self.columns[name], kind="stable")
+        return self.__orders[name]
+
+    def query(self, **ranges):
+        """Rows whose columns lie in the given inclusive ranges, in increasing order.
+
+        Each range is a (low, high) pair where None leaves a side open, e.g.
+        ``index.query(shortest_path=(20, 40), loops=(1, None))``.
+        """
+        rows = None
+        for name, (low, high) in ranges.items():
+            if name not in self.columns:
+                raise ValueError(
+                    "name cannot be %s. The only valid columns are %s."
+                    % (str(name), str(tuple(self.columns)))
+                )
+            values = self.columns[name]
+            if rows is None:
+                # the first range is a slice of the sorted order of its column
+                order = self.__order(name)
+                sorted_values = values[order]
+                first = 0 if low is None else np.searchsorted(sorted_values, low, "left")
+                last = len(order) if high is None else np.searchsorted(sorted_values, high, "right")
+                rows = order[first:last]
+            else:
+                inside = np.ones(len(rows), dtype=bool)
+                if low is not None:
+                    inside &= values[rows] >= low
+                if high is not None:
+                    inside &= values[rows] <= high
+                rows = rows[inside]
+        if rows is None:
+            return np.arange(len(self))
+        return np.sort(rows)
+
+    def sample(self, num, weights=None, rows=None, rng=None):
+        """Draws num rows with replacement, among rows (all by default).
+
+        weights is None for uniform sampling, the name of a column or an array with a weight
+        per row of rows. rng is a NumPy random generator such as the np_random of an env.
+        """
+        rows = np.arange(len(self)) if rows is None else np.asarray(rows)
+        if len(rows) == 0:
+            raise ValueError("There are no rows to sample from.")
+        if rng is None:
+            rng = np.random
+        p = None
+        if weights is not None:
+            if isinstance(weights, str):
+                weights = self.columns[weights][rows]
+            weights = np.asarray(weights, dtype=float)
+            if weights.shape != rows.shape or (weights < 0).any() or weights.sum() <= 0:
+                raise ValueError("weights must be non-negative, with one per row, not all 0.")
+            p = weights / weights.sum()
+        return rows[rng.choice(len(rows), num, p=p)]
+
+    def select_tasks(self, rows):
+        """The MazeTask of each row, to build with build_maze or pass to evaluate.
+        """
+        return [self.tasks[i] for i in np.asarray(rows).ravel()]
+
+
+def index_directory(directory, num_workers=None, chunk_size=256, context=None):
+    """Indexes every maze file of a directory and saves the index next to them, as INDEX_FILE.
+    """
+    index = MazeIndex.build(directory_tasks(directory), num_workers, chunk_size, context)
+    index.save(os.path.join(directory, INDEX_FILE))
+    return index
@@ -0,0 +1,217 @@
+import multiprocessing
+
+import numpy as np
+
+from gym_maze.envs.maze_render import MazeRenderer
+
+# Layout of the shared snapshot: a header of int64 slots followed by (x, y) robot cells.
+VERSION, STOP, CLOSED, NUM_ROBOTS, ENTRANCE_X, ENTRANCE_Y, GOAL_X, GOAL_Y = range(8)
+HEADER_SIZE = 8
+
+# colours of the entrance and goal cells, as in MazeView2D
+MARK_COLOURS = ((0, 0, 150), (150, 0, 0))
+
+
+def _run_display(maze, snapshot, max_robots, fps, cell_size, title):
+    # the drawing loop of the display process, which owns everything pygame
+    import pygame
+
+    header = np.frombuffer(snapshot, dtype=np.int64, count=HEADER_SIZE)
+    robots = np.frombuffer(snapshot, dtype=np.int64, offset=HEADER_SIZE * 8).reshape(max_robots, 2)
+    renderer = MazeRenderer(maze, cell_size=cell_size)
+    radius = max(cell_size / 5.0, 1.0)
+
+    pygame.init()
+    pygame.display.set_caption(title)
+    height, width = renderer.image.shape[:2]
+    screen = pygame.display.set_mode((width, height))
+    clock = pygame.time.Clock()
+
+    # the maze with its entrance and goal is only drawn again when they move
+    drawn = -1
+    marked = None
+    marks = np.full(maze.maze_size, np.nan)
+    try:
+        while not header[STOP]:
+            for event in pygame.event.get():
+                if event.type == pygame.QUIT:
+                    header[CLOSED] = 1
+                    return
+            version = int(header[VERSION])
+            if version != drawn:
+                drawn = version
+                if marked != tuple(header[ENTRANCE_X : GOAL_Y + 1]):
+                    marked = tuple(header[ENTRANCE_X : GOAL_Y + 1])
+                    marks[:] = np.nan
+                    marks[marked[0], marked[1]] = 0.0
+                    marks[marked[2], marked[3]] = 1.0
+                    image = renderer.frame(
+                        heatmap=marks, cmap=MARK_COLOURS, vmin=0.0, vmax=1.0, alpha=0.3
+                    )
+                    background = pygame.surfarray.make_surface(image.swapaxes(0, 1))
+                screen.blit(background, (0, 0))
+                for x, y in robots[: header[NUM_ROBOTS]].tolist():
+                    centre = ((x + 0.5) * cell_size, (y + 0.5) * cell_size)
+                    pygame.draw.circle(screen, renderer.robot_colour, centre, radius)
+                pygame.display.flip()
+            clock.tick(fps)
+    finally:
+        header[CLOSED] = 1
+        pygame.quit()
+
+
+class MazeDisplay:
+    """Draws a maze in a window of its own process, at a capped frame rate.
+
+    Stepping only publishes the latest robot cells into a small snapshot in shared memory,
+    which costs a few writes and never waits for the display. The display process reads
+    the snapshot, redraws with MazeRenderer when it changed and handles the pygame events at
+    up to fps frames per second. Closing the window ends the display process and sets
+    ``closed``, which the environments report as game over; the learner keeps running. The
+    process is spawned by default, as pygame must not be shared with a forked parent, so
+    scripts creating a display need the usual ``if __name__ == "__main__":`` guard.
+    """
+
+    def __init__(
+        self, maze, max_robots=1, fps=30, cell_size=None, title=None, start=True, context="spawn"
+    ):
+        if fps <= 0:
+            raise ValueError("fps must be a positive number.")
+        if max_robots < 1:
+            raise ValueError("max_robots must be a positive number.")
+        self.maze = maze
+        self.max_robots = int(max_robots)
+        self.fps = fps
+        if cell_size is None:
+            cell_size = max(1, 640 // max(maze.MAZE_W, maze.MAZE_H))
+        self.cell_size = int(cell_size)
+        if title is None:
+            title = "OpenAI Gym - Maze (%d x %d)" % tuple(maze.maze_size)
+        self.title = title
+
+        self.__context = multiprocessing.get_context(context)
+        self.__snapshot = self.__context.RawArray("q", HEADER_SIZE + 2 * self.max_robots)
+        self.__robots = np.frombuffer(
+            self.__snapshot, dtype=np.int64, offset=HEADER_SIZE * 8
+        ).reshape(self.max_robots, 2)
+        self.__snapshot[GOAL_X] = maze.MAZE_W - 1
+        self.__snapshot[GOAL_Y] = maze.MAZE_H - 1
+        self.__process = None
+        if start:
+            self.start()
+
+    def start(self):
+        """Starts the display process, if it is not running yet.
+        """
+        if self.__process is not None:
+            return
+        self.__process = self.__context.Process(
+            target=_run_display,
+            args=(
+                self.maze,
+                self.__snapshot,
+                self.max_robots,
+                self.fps,
+                self.cell_size,
+                self.title,
+            ),
+            daemon=True,
+        )
+        self.__process.start()
+
+    def publish(self, positions, entrance=None, goal=None):
+        """Publishes the (x, y) cell of the robot, or an (A, 2) array of them, for the next frame.
+
+        The entrance and goal cells are kept from the previous calls unless given.
+        """
+        # single values go straight into the shared array, which is cheaper than through NumPy
+        snapshot = self.__snapshot
+        if np.ndim(positions) == 1:
+            snapshot[HEADER_SIZE] = positions[0]
+            snapshot[HEADER_SIZE + 1] = positions[1]
+            snapshot[NUM_ROBOTS] = 1
+        else:
+            if len(positions) > self.max_robots:
+                raise ValueError("The display was made for %d robots at most." % self.max_robots)
+            self.__robots[: len(positions)] = positions
+            snapshot[NUM_ROBOTS] = len(positions)
+        if entrance is not None:
+            snapshot[ENTRANCE_X] = entrance[0]
+            snapshot[ENTRANCE_Y] = entrance[1]
+        if goal is not None:
+            snapshot[GOAL_X] = goal[0]
+            snapshot[GOAL_Y] = goal[1]
+        snapshot[VERSION] += 1
+
+    @property
+    def closed(self):
+        return bool(self.__snapshot[CLOSED])
+
+    def close(self):
+        """Stops the display process and closes its window.
+        """
+        if self.__process is None:
+            return
+        self.__snapshot[STOP] = 1
+        self.__process.join(1.0)
+        if self.__process.is_alive():
+            self.__process.terminate()
+            self.__process.join()
+        self.__snapshot[CLOSED] = 1
+        self.__process = None
+
+
+class MazeDisplayMixin:
+    """Rendering shared by the environments that draw robots in the maze of a MazeView2D.
+
+    With enable_render, frames are drawn in the window of ``maze_view`` on every step. With
+    async_render, a MazeDisplay ``viewer`` draws the published robots at its own rate instead,
+    and without either, rgb_array frames are drawn with a MazeRenderer.
+    """
+
+    def _init_display(self, enable_render, async_render):
+        # an asynchronous window replaces the one drawn on every step
+        self.viewer = None
+        self.async_render = async_render
+        self.enable_render = enable_render and not async_render
+        self.__renderer = None
+
+    def _open_display(self, max_robots=1, fps=30):
+        if self.async_render:
+            self.viewer = MazeDisplay(self.maze_view.maze, max_robots=max_robots, fps=fps)
+
+    def _render(self, mode, close, positions, heatmap=None, egocentric=False):
+        if close:
+            self.maze_view.quit_game()
+            if self.viewer is not None:
+                self.viewer.close()
+            return None
+
+        # the asynchronous window draws the last published state by itself
+        if self.viewer is not None and mode == "human" and not egocentric:
+            return None
+
+        # without a window, frames are drawn with NumPy
+        if not self.enable_render:
+            if mode != "rgb_array" or egocentric:
+                raise ValueError("Only the rgb_array mode is available without rendering.")
+            return self.renderer.frame(heatmap=heatmap, positions=positions)
+
+        return self.maze_view.update(mode, egocentric)
+
+    @property
+    def renderer(self):
+        if self.__renderer is None or self.__renderer.maze is not self.maze_view.maze:
+            self.__renderer = MazeRenderer(self.maze_view.maze)
+        return self.__renderer
+
+    def is_game_over(self):
+        if self.viewer is not None and self.viewer.closed:
+            return True
+        return self.maze_view.game_over
+
+    def close(self):
+        if self.enable_render is True:
+            self.maze_view.quit_game()
+        if self.viewer is not None:
+            self.viewer.close()
@@ -0,0 +1,189 @@
+import numpy as np
+
+
+def _directions(maze):
+    # the (D, ndim) unit moves of the columns of maze.transitions
+    if hasattr(maze, "COMPASS"):
+        return np.array(list(maze.COMPASS.values()))
+    return maze.directions
+
+
+class TransitionModel:
+    """Transition probabilities compiled from a DynamicsSpec for one maze.
+
+    A move in direction d (a column of ``maze.transitions``) from flat cell s ends in one of K
+    outcomes: cell ``dest[s, d, k]`` with probability ``prob[s, d, k]``. Sampling draws one
+    uniform number per move and finds its outcome in the cumulative probabilities, so scalars
+    and arrays of moves cost the same few array operations.
+    """
+
+    def __init__(self, dest, prob):
+        self.dest = np.asarray(dest, dtype=np.int64)
+        self.prob = np.asarray(prob, dtype=float)
+        if self.dest.shape != self.prob.shape or self.dest.ndim != 3:
+            raise ValueError("dest and prob must both be shaped (cells, directions, outcomes).")
+        self.cdf = np.cumsum(self.prob, axis=-1)
+        if not np.allclose(self.cdf[..., -1], 1.0):
+            raise ValueError("The probabilities of the outcomes of each move must sum to 1.")
+        self.cdf[..., -1] = 1.0
+
+    @classmethod
+    def deterministic(cls, maze):
+        return cls(maze.transitions[..., None], np.ones(maze.transitions.shape + (1,)))
+
+    @property
+    def num_cells(self):
+        return self.dest.shape[0]
+
+    @property
+    def num_directions(self):
+        return self.dest.shape[1]
+
+    def sample(self, cells, dirs, rng):
+        """Flat cells reached by moving from cells in the directions dirs, drawn with rng.
+        """
+        if np.ndim(cells) == 0 and np.ndim(dirs) == 0:
+            k = np.searchsorted(self.cdf[cells, dirs], rng.random(), side="right")
+            return self.dest[cells, dirs, k]
+        cells, dirs = np.broadcast_arrays(cells, dirs)
+        u = rng.random(cells.shape)
+        k = (u[..., None] >= self.cdf[cells, dirs]).sum(axis=-1)
+        return self.dest[cells, dirs, k]
+
+    def sparse(self):
+        """The (S, D, S') table as coordinate arrays: cells, directions, next cells, probability.
+
+        Outcomes that reach the same cell are merged and impossible ones dropped.
+        """
+        num_cells, num_dirs, num_outcomes = self.dest.shape
+        moves = np.repeat(np.arange(num_cells * num_dirs), num_outcomes)
+        keys = moves * num_cells + self.dest.ravel()
+        keys, inverse = np.unique(keys, return_inverse=True)
+        prob = np.bincount(inverse.ravel(), weights=self.prob.ravel(), minlength=len(keys))
+        keep = prob > 0
+        keys, prob = keys[keep], prob[keep]
+        moves, next_cells = np.divmod(keys, num_cells)
+        cells, dirs = np.divmod(moves, num_dirs)
+        return cells, dirs, next_cells, prob
+
+    def value_iteration(self, reward_table, gamma=0.99, tol=1e-8, max_iter=10000):
+        """Optimal values and greedy directions of every cell, for a compiled RewardTable.
+
+        The reward of a move is the one of RewardTable without its novelty bonus, and values
+        stop at terminal cells. Returns the (S,) values and the (S,) directions, as columns
+        of maze.transitions.
+        """
+        cells, dirs, next_cells, prob = self.sparse()
+        moves = cells * self.num_directions + dirs
+        size = self.num_cells * self.num_directions
+        reward = reward_table.arrive[next_cells] - reward_table.leave[cells]
+        expected = np.bincount(moves, weights=prob * reward, minlength=size)
+        going_on = prob * ~reward_table.terminal[next_cells]
+
+        values = np.zeros(self.num_cells)
+        for _ in range(max_iter):
+            q = expected + gamma * np.bincount(
+                moves, weights=going_on * values[next_cells], minlength=size
+            )
+            q = q.reshape(self.num_cells, self.num_directions)
+            new_values = q.max(axis=1)
+            delta = np.abs(new_values - values).max()
+            values = new_values
+            if delta < tol:
+                break
+        return values, q.argmax(axis=1)
+
+
+class DynamicsSpec:
+    """Base class of the stochastic transition models accepted by MazeEnv.
+
+    Subclasses implement ``compile(maze)`` and return a TransitionModel.
+    """
+
+    def compile(self, maze):
+        raise NotImplementedError
+
+
+class Slip(DynamicsSpec):
+    """With probability p the agent slips and moves in a perpendicular direction instead.
+
+    The perpendicular directions are equally likely (left or right in 2D).
+    """
+
+    def __init__(self, p=0.1):
+        if not 0 <= p <= 1:
+            raise ValueError("p must be a probability.")
+        self.p = float(p)
+
+    def compile(self, maze):
+        directions = _directions(maze)
+        perpendicular = [np.flatnonzero(directions @ d == 0) for d in directions]
+        # every direction has as many perpendicular ones, as they come in +- pairs
+        outcomes = np.array([np.concatenate([[d], p]) for d, p in enumerate(perpendicular)])
+        num_slips = outcomes.shape[1] - 1
+        dest = maze.transitions[:, outcomes]
+        prob = np.full(outcomes.shape, self.p / max(num_slips, 1))
+        prob[:, 0] = 1.0 - self.p if num_slips else 1.0
+        return TransitionModel(dest, np.broadcast_to(prob, dest.shape))
+
+
+class ActionNoise(DynamicsSpec):
+    """With probability p the action is replaced by a uniformly random direction.
+    """
+
+    def __init__(self, p=0.1):
+        if not 0 <= p <= 1:
+            raise ValueError("p must be a probability.")
+        self.p = float(p)
+
+    def compile(self, maze):
+        num_dirs = maze.transitions.shape[1]
+        dest = np.repeat(maze.transitions[:, None, :], num_dirs, axis=1)
+        prob = np.full((num_dirs, num_dirs), self.p / num_dirs)
+        prob[np.diag_indices(num_dirs)] += 1.0 - self.p
+        return TransitionModel(dest, np.broadcast_to(prob, dest.shape))
+
+
+class Wind(DynamicsSpec):
+    """After each move, the wind of the cell reached pushes the agent one more cell.
+
+    strength is the probability of a push, one value or a map shaped like the maze, and
+    direction the direction of the wind: a COMPASS key, the index of a column of
+    maze.transitions, or a map of such indices. A push into a wall leaves the agent where it
+    is. The moves blown about are those of another DynamicsSpec, deterministic by default.
+    """
+
+    def __init__(self, strength=0.2, direction="E", base=None):
+        if base is not None and not isinstance(base, DynamicsSpec):
+            raise TypeError("base must be a DynamicsSpec.")
+        self.strength = strength
+        self.direction = direction
+        self.base = base
+
+    def compile(self, maze):
+        if self.base is None:
+            base = TransitionModel.deterministic(maze)
+        else:
+            base = self.base.compile(maze)
+
+        strength = np.broadcast_to(np.asarray(self.strength, dtype=float), maze.maze_size)
+        if ((strength < 0) | (strength > 1)).any():
+            raise ValueError("strength must be a probability, or a map of probabilities.")
+        direction = self.direction
+        if isinstance(direction, str):
+            compass = list(getattr(maze, "COMPASS", dict()).keys())
+            if direction not in compass:
+                raise ValueError(
+                    "direction cannot be %s. The only valid directions are %s or the index of a "
+                    "column of maze.transitions." % (direction, str(compass))
+                )
+            direction = compass.index(direction)
+        direction = np.broadcast_to(np.asarray(direction, dtype=np.int64), maze.maze_size)
+
+        # the landing cell of every outcome of the base, then pushed or not
+        landed = base.dest
+        blow = strength.ravel()[landed]
+        pushed = maze.transitions[landed, direction.ravel()[landed]]
+        dest = np.concatenate([landed, pushed], axis=-1)
+        prob = np.concatenate([base.prob * (1.0 - blow), base.prob * blow], axis=-1)
+        return TransitionModel(dest, prob)
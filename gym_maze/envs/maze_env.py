@@ -2,61 +2,163 @@ import gym
 import numpy as np
 import networkx as nx
 
+from collections import namedtuple
 from itertools import islice
 from gym import spaces
 from gym.utils import seeding
 from gym_maze.envs.maze_view_2d import MazeView2D
+from gym_maze.envs.maze_reward import RewardSpec, GoalReward
+from gym_maze.envs.maze_sampling import StartGoalSampler
+from gym_maze.envs.maze_observation import ObservationSpec
+from gym_maze.envs.maze_dynamics import DynamicsSpec
+from gym_maze.envs.maze_display import MazeDisplayMixin
+from gym_maze.envs.maze_junctions import JunctionGraph
+from gym_maze.envs.maze_planner import HierarchicalPlanner
+
+
+def maze_options(maze_size, mode=None):
+    """Generation options of the random mazes of a mode: None, or "plus" for loops and portals.
+    """
+    if mode == "plus":
+        return dict(has_loops=True, num_portals=int(round(min(maze_size) / 3)))
+    return dict(has_loops=False, num_portals=0)
+
+
+def make_maze_view(maze_file=None, maze_size=None, mode=None, enable_render=True):
+    """Builds the MazeView2D of a sample maze file or of a random maze of the given size.
+    """
+    if maze_file:
+        return MazeView2D(
+            maze_name="OpenAI Gym - Maze (%s)" % maze_file,
+            maze_file_path=maze_file,
+            screen_size=(640, 640),
+            enable_render=enable_render,
+        )
+    elif maze_size:
+        return MazeView2D(
+            maze_name="OpenAI Gym - Maze (%d x %d)" % maze_size,
+            maze_size=maze_size,
+            screen_size=(640, 640),
+            enable_render=enable_render,
+            **maze_options(maze_size, mode)
+        )
+    else:
+        raise AttributeError(
+            "One must supply either a maze_file path (str) or the maze_size (tuple of length 2)"
+        )
+
+
+# The mutable part of a MazeEnv: the flat cell index of the robot, the number of steps taken,
+# the done flag, the state of np_random and the novelty visit counts (None without novelty).
+MazeState = namedtuple("MazeState", ["robot", "steps", "done", "rng_state", "visits"])
+
+
+def _get_rng_state(rng):
+    if hasattr(rng, "bit_generator"):
+        return rng.bit_generator.state
+    return rng.get_state()
+
+
+def _set_rng_state(rng, rng_state):
+    if hasattr(rng, "bit_generator"):
+        rng.bit_generator.state = rng_state
+    else:
+        rng.set_state(rng_state)
+
+
+def _make_rng(rng, rng_state):
+    # a new generator of the same kind as rng, in the given state
+    if hasattr(rng, "bit_generator"):
+        new_rng = np.random.Generator(type(rng.bit_generator)())
+    else:
+        new_rng = np.random.RandomState()
+    _set_rng_state(new_rng, rng_state)
+    return new_rng
 
 
-class MazeEnv(gym.Env):
+class MazeEnv(MazeDisplayMixin, gym.Env):
     metadata = {
         "render.modes": ["human", "rgb_array"],
     }
 
     ACTION = ["N", "S", "E", "W"]
 
-    def __init__(self, maze_file=None, maze_size=None, mode=None, enable_render=True):
-
-        self.viewer = None
-        self.enable_render = enable_render
-
-        if maze_file:
-            self.maze_view = MazeView2D(
-                maze_name="OpenAI Gym - Maze (%s)" % maze_file,
-                maze_file_path=maze_file,
-                screen_size=(640, 640),
-                enable_render=enable_render,
-            )
-        elif maze_size:
-            if mode == "plus":
-                has_loops = True
-                num_portals = int(round(min(maze_size) / 3))
-            else:
-                has_loops = False
-                num_portals = 0
-
-            self.maze_view = MazeView2D(
-                maze_name="OpenAI Gym - Maze (%d x %d)" % maze_size,
-                maze_size=maze_size,
-                screen_size=(640, 640),
-                has_loops=has_loops,
-                num_portals=num_portals,
-                enable_render=enable_render,
-            )
-        else:
-            raise AttributeError(
-                "One must supply either a maze_file path (str) or the maze_size (tuple of length 2)"
-            )
+    def __init__(
+        self,
+        maze_file=None,
+        maze_size=None,
+        mode=None,
+        enable_render=True,
+        reward=None,
+        start_goal=None,
+        observation=None,
+        macro_actions=False,
+        async_render=False,
+        render_fps=30,
+        dynamics=None,
+    ):
+
+        self._init_display(enable_render, async_render)
+
+        # the reward specification is compiled into per-cell tables on reset
+        if reward is None:
+            reward = GoalReward()
+        if not isinstance(reward, RewardSpec):
+            raise TypeError("reward must be a RewardSpec.")
+        self.reward_spec = reward
+        self.reward_table = None
+        self.__reward_maze = None
+        self.__reward_goal = None
+
+        # None keeps the entrance and goal of the maze view
+        if start_goal is not None and not isinstance(start_goal, StartGoalSampler):
+            raise TypeError("start_goal must be a StartGoalSampler.")
+        self.start_goal = start_goal
+
+        # None keeps the egocentric pixel crop of the rendered maze
+        if observation is not None and not isinstance(observation, ObservationSpec):
+            raise TypeError("observation must be an ObservationSpec.")
+        self.observation = observation
+
+        # each action follows corridors up to the next junction, dead end or goal
+        self.macro_actions = macro_actions
+        self.junctions = None
+        self.macro_rewards = None
+
+        # None keeps the moves deterministic
+        if dynamics is not None and not isinstance(dynamics, DynamicsSpec):
+            raise TypeError("dynamics must be a DynamicsSpec.")
+        if dynamics is not None and macro_actions:
+            raise ValueError("macro_actions cannot be combined with stochastic dynamics.")
+        self.dynamics = dynamics
+        self.transition_model = None
+
+        self.maze_view = make_maze_view(maze_file, maze_size, mode, self.enable_render)
+        self.__planner = None
+        self._open_display(fps=render_fps)
 
         self.maze_size = self.maze_view.maze_size
 
+        # action index to COMPASS index
+        compass = list(self.maze_view.maze.COMPASS.keys())
+        self.__action_dirs = np.array([compass.index(a) for a in self.ACTION])
+
         # forward or backward in each dimension
         self.action_space = spaces.Discrete(2 * len(self.maze_size))
 
-        # observation is the x, y coordinate of the grid
-        low = np.zeros(len(self.maze_size), dtype=int)
-        high = np.array(self.maze_size, dtype=int) - np.ones(len(self.maze_size), dtype=int)
-        self.observation_space = spaces.Box(low, high, dtype=np.int64)
+        if self.observation is None:
+            # observation is the x, y coordinate of the grid
+            low = np.zeros(len(self.maze_size), dtype=int)
+            high = np.array(self.maze_size, dtype=int) - np.ones(len(self.maze_size), dtype=int)
+            self.observation_space = spaces.Box(low, high, dtype=np.int64)
+        else:
+            # observation is a patch of open-wall bitmasks
+            self.observation_space = spaces.Box(
+                0,
+                0x1F,
+                shape=self.observation.shape(self.maze_view.maze),
+                dtype=np.uint8,
+            )
 
         # initial condition
         self.state = None
@@ -79,9 +181,19 @@ class MazeEnv(gym.Env):
         paths = [self.maze_view.maze.coords2compas(p) for p in paths]
         return paths
 
+    def shortest_path(self):
+        """Actions of a shortest path from the robot to the goal (through portals too).
+
+        Queries the HierarchicalPlanner of the maze, which is built on the first call. Returns
+        None if the goal cannot be reached.
+        """
+        dirs = self.planner.shortest_path(self.maze_view.robot, self.maze_view.goal)
+        if dirs is None:
+            return None
+        return [int(np.flatnonzero(self.__action_dirs == d)[0]) for d in dirs]
+
     def __del__(self):
-        if self.enable_render is True:
-            self.maze_view.quit_game()
+        self.close()
 
     def configure(self, display=None):
         self.display = display
@@ -91,39 +203,246 @@ class MazeEnv(gym.Env):
         return [seed]
 
     def step(self, action):
-        if isinstance(action, int):
-            self.maze_view.move_robot(self.ACTION[action])
+        reward, done, move = self.__advance(action)
+        info = {}
+        if self.macro_actions:
+            info["primitive_steps"] = int(self.junctions.length.ravel()[move])
+
+        if self.observation is not None:
+            self.state = self.observation.observe(self.maze_view.robot)
+            if self.enable_render:
+                self.render()
+        elif self.enable_render:
+            self.state = self.render(egocentric=True)
         else:
-            self.maze_view.move_robot(action)
-
-        if np.array_equal(self.maze_view.robot, self.maze_view.goal):
-            reward = 1
-            done = True
+            self.state = self.maze_view.robot.copy()
+
+        return self.state, float(reward), done, info
+
+    def step_into(self, action, observation, reward, done, index=0):
+        """Steps like step, but writes into row index of the observation, reward and done arrays
+        given by the caller, such as the ring buffers of a replay memory.
+        """
+        # no info dict is made and the robot moves in place
+        r, d, _ = self.__advance(action)
+        reward[index] = r
+        done[index] = d
+        self.__observe_into(observation, index)
+
+    def __advance(self, action):
+        # moves the robot by one entry of the move tables, returns its reward and done flag
+        if isinstance(action, str):
+            action = self.ACTION.index(action)
+        robot = self.maze_view.robot
+        height = self.maze_view.maze.MAZE_H
+        prev = robot[0] * height + robot[1]
+        table = self.reward_table
+        if self.transition_model is None:
+            cell, reward, move = table.step(prev, self.__action_dirs[action])
+        else:
+            move = prev * table.num_dirs + self.__action_dirs[action]
+            cell = self.transition_model.sample(prev, self.__action_dirs[action], self.np_random)
+            reward = table.arrive[cell] - table.leave[prev] + table.visit(cell)
+        self.maze_view.place_robot(cell // height, cell % height)
+        if self.viewer is not None:
+            self.viewer.publish(robot)
+        self.steps += 1
+        self.done = bool(self.reward_table.terminal[cell])
+        return reward, self.done, move
+
+    def __observe_into(self, observation, index):
+        # observations, rendered frames too, go straight into their row
+        if self.observation is not None:
+            self.observation.observe_into(self.maze_view.robot, observation[index])
+            if self.enable_render:
+                self.render()
+        elif self.enable_render:
+            self.maze_view.update(egocentric=True, out=observation[index])
         else:
-            reward = -0.1 / (self.maze_size[0] * self.maze_size[1])
-            done = False
+            observation[index] = self.maze_view.robot
 
-        self.state = self.render(egocentric=True)
+    def reset(self):
+        self.__reset()
+        self.state = None
+        if self.observation is not None:
+            self.state = self.observation.observe(self.maze_view.robot)
+        elif not self.enable_render:
+            self.state = self.maze_view.robot.copy()
+        return self.state
 
-        info = {}
+    def reset_into(self, observation, index=0):
+        """Resets like reset, writing the first observation into row index of observation.
 
-        return self.state, reward, done, info
+        The tables of the maze, the reward and the observation spec are reused, so only a
+        StartGoalSampler allocates.
+        """
+        self.__reset()
+        self.__observe_into(observation, index)
 
-    def reset(self):
+    def __reset(self):
+        if self.start_goal is not None:
+            start, goal = self.start_goal.sample(self.maze_view.maze, self.np_random)
+            self.maze_view.set_entrance(start)
+            self.maze_view.set_goal(goal)
         self.maze_view.reset_robot()
-        self.state = None
+        if self.viewer is not None:
+            self.viewer.publish(self.maze_view.robot, self.maze_view.entrance, self.maze_view.goal)
+        self.compile_reward()
+        self.compile_dynamics()
+        if self.observation is not None:
+            self.observation.reset(self.maze_view.maze)
         self.steps_beyond_done = None
+        self.steps = 0
         self.done = False
-        return self.state
 
-    def is_game_over(self):
-        return self.maze_view.game_over
+    def get_state(self):
+        """Captures the mutable state of the environment as a small MazeState.
+        """
+        visits = self.reward_table.visits
+        return MazeState(
+            robot=int(self.maze_view.maze.cell_to_index(self.maze_view.robot)),
+            steps=self.steps,
+            done=self.done,
+            rng_state=_get_rng_state(self.np_random),
+            visits=None if visits is None else visits.copy(),
+        )
+
+    def set_state(self, state):
+        """Restores a MazeState taken by get_state on the same maze and goal.
+
+        The observation modes are not part of the state: the memory of ExploredMap is kept.
+        """
+        self.maze_view.set_robot(self.maze_view.maze.index_to_cell(state.robot))
+        self.steps = state.steps
+        self.done = state.done
+        _set_rng_state(self.np_random, state.rng_state)
+        if state.visits is not None:
+            self.reward_table.visits = state.visits.copy()
+
+    def simulate(self, state, actions, rewards=None, dones=None):
+        """Rolls out (T,) or (B, T) actions from a MazeState without touching the environment.
+
+        Returns the rewards and done flags shaped like actions, written into rewards and dones
+        when given, and the final MazeState, or a list of them for a batch.
+        """
+        actions = np.asarray(actions, dtype=int)
+        batched = actions.ndim == 2
+        if rewards is None:
+            rewards = np.zeros(actions.shape)
+        if dones is None:
+            dones = np.zeros(actions.shape, dtype=bool)
+        actions = actions.reshape(-1, actions.shape[-1])
+        num_rollouts, num_steps = actions.shape
+
+        # views with a row per rollout
+        all_rewards = rewards if batched else rewards[None]
+        all_dones = dones if batched else dones[None]
+
+        # apart from the final states, every step reuses these buffers
+        dirs = self.__action_dirs[actions]
+        cells = np.full(num_rollouts, state.robot)
+        nexts = np.empty_like(cells)
+        moves = np.empty_like(cells)
+        steps = np.full(num_rollouts, state.steps)
+        done = np.full(num_rollouts, state.done)
+        terminal = np.empty_like(done)
+        reward = np.empty(num_rollouts)
+        visits = None
+        if state.visits is not None:
+            visits = np.array(np.broadcast_to(state.visits, (num_rollouts,) + state.visits.shape))
+        # stochastic moves are drawn from a copy of the random state of the MazeState, so a
+        # single rollout replays the moves step would draw
+        rng = None
+        if self.transition_model is not None:
+            rng = _make_rng(self.np_random, state.rng_state)
+
+        table = self.reward_table
+        for t in range(num_steps):
+            if rng is None:
+                np.multiply(cells, table.num_dirs, out=moves)
+                moves += dirs[:, t]
+                np.take(table.move_dest, moves, out=nexts)
+                np.copyto(nexts, cells, where=done)
+                np.take(table.move_rewards, moves, out=reward)
+            else:
+                nexts[:] = self.transition_model.sample(cells, dirs[:, t], rng)
+                np.copyto(nexts, cells, where=done)
+                reward[:] = self.reward_table.arrive[nexts] - self.reward_table.leave[cells]
+            if visits is not None:
+                reward += self.reward_table.novelty(nexts, visits, ~done)
+            # finished rollouts ignore their remaining actions and earn no reward
+            np.copyto(reward, 0.0, where=done)
+            np.subtract(steps, done, out=steps)
+            steps += 1
+            np.take(self.reward_table.terminal, nexts, out=terminal)
+            done |= terminal
+            all_rewards[:, t] = reward
+            all_dones[:, t] = done
+            cells, nexts = nexts, cells
+
+        finals = [
+            MazeState(
+                robot=int(cells[i]),
+                steps=int(steps[i]),
+                done=bool(done[i]),
+                rng_state=state.rng_state if rng is None else _get_rng_state(rng),
+                visits=None if visits is None else visits[i],
+            )
+            for i in range(num_rollouts)
+        ]
+        if batched:
+            return rewards, dones, finals
+        return rewards, dones, finals[0]
+
+    def compile_dynamics(self):
+        """Compiles the dynamics specification into the TransitionModel of the current maze.
+
+        The model is only rebuilt when the maze changed since the last call.
+        """
+        maze = self.maze_view.maze
+        if self.dynamics is not None and (
+            self.transition_model is None or maze is not self.__dynamics_maze
+        ):
+            self.transition_model = self.dynamics.compile(maze)
+            self.__dynamics_maze = maze
+        return self.transition_model
+
+    def compile_reward(self, batch_size=None):
+        """Compiles the reward specification for the current maze and goal, then resets it.
+
+        The tables are only rebuilt when the maze or the goal changed since the last call.
+        """
+        maze = self.maze_view.maze
+        goal = tuple(self.maze_view.goal)
+        if (
+            self.reward_table is None
+            or maze is not self.__reward_maze
+            or goal != self.__reward_goal
+        ):
+            self.reward_table = self.reward_spec.compile(maze, goal)
+            self.__reward_maze = maze
+            self.__reward_goal = goal
+            if self.macro_actions:
+                # the junction graph is built once per maze and only cut at the new goal
+                stops = maze.index_to_cell(np.flatnonzero(self.reward_table.terminal))
+                if self.junctions is None or self.junctions.maze is not maze:
+                    self.junctions = JunctionGraph(maze)
+                self.junctions.set_stops(stops)
+                self.macro_rewards = self.junctions.path_rewards(self.reward_table)
+                self.reward_table.compile_moves(self.junctions.dest, self.macro_rewards)
+            else:
+                self.reward_table.compile_moves(maze.transitions)
+        self.reward_table.reset(batch_size)
+        return self.reward_table
 
     def render(self, mode="human", close=False, egocentric=False):
-        if close:
-            self.maze_view.quit_game()
+        return self._render(mode, close, self.maze_view.robot[None], egocentric=egocentric)
 
-        return self.maze_view.update(mode, egocentric)
+    @property
+    def planner(self):
+        if self.__planner is None or self.__planner.maze is not self.maze_view.maze:
+            self.__planner = HierarchicalPlanner(self.maze_view.maze)
+        return self.__planner
 
     def compas2int(self, c):
         return MazeEnv.ACTION.index(c)
@@ -134,71 +453,77 @@ class MazeEnv(gym.Env):
 
 
 class MazeEnvSample5x5(MazeEnv):
-    def __init__(self, enable_render=True):
+    def __init__(self, enable_render=True, **kwargs):
         super(MazeEnvSample5x5, self).__init__(
-            maze_file="maze2d_5x5.npy", enable_render=enable_render
+            maze_file="maze2d_5x5.npy", enable_render=enable_render, **kwargs
         )
 
 
 class MazeEnvRandom5x5(MazeEnv):
-    def __init__(self, enable_render=True):
-        super(MazeEnvRandom5x5, self).__init__(maze_size=(5, 5), enable_render=enable_render)
+    def __init__(self, enable_render=True, **kwargs):
+        super(MazeEnvRandom5x5, self).__init__(
+            maze_size=(5, 5), enable_render=enable_render, **kwargs
+        )
 
 
 class MazeEnvSample10x10(MazeEnv):
-    def __init__(self, enable_render=True):
+    def __init__(self, enable_render=True, **kwargs):
         super(MazeEnvSample10x10, self).__init__(
-            maze_file="maze2d_10x10.npy", enable_render=enable_render
+            maze_file="maze2d_10x10.npy", enable_render=enable_render, **kwargs
         )
 
 
 class MazeEnvRandom10x10(MazeEnv):
-    def __init__(self, enable_render=True):
-        super(MazeEnvRandom10x10, self).__init__(maze_size=(10, 10), enable_render=enable_render)
+    def __init__(self, enable_render=True, **kwargs):
+        super(MazeEnvRandom10x10, self).__init__(
+            maze_size=(10, 10), enable_render=enable_render, **kwargs
+        )
 
 
 class MazeEnvSample3x3(MazeEnv):
-    def __init__(self, enable_render=True):
+    def __init__(self, enable_render=True, **kwargs):
         super(MazeEnvSample3x3, self).__init__(
-            maze_file="maze2d_3x3.npy", enable_render=enable_render
+            maze_file="maze2d_3x3.npy", enable_render=enable_render, **kwargs
         )
 
 
 class MazeEnvRandom3x3(MazeEnv):
-    def __init__(self, enable_render=True):
-        super(MazeEnvRandom3x3, self).__init__(maze_size=(3, 3), enable_render=enable_render)
+    def __init__(self, enable_render=True, **kwargs):
+        super(MazeEnvRandom3x3, self).__init__(
+            maze_size=(3, 3), enable_render=enable_render, **kwargs
+        )
 
 
 class MazeEnvSample100x100(MazeEnv):
-    def __init__(self, enable_render=True):
+    def __init__(self, enable_render=True, **kwargs):
         super(MazeEnvSample100x100, self).__init__(
-            maze_file="maze2d_100x100.npy", enable_render=enable_render
+            maze_file="maze2d_100x100.npy", enable_render=enable_render, **kwargs
         )
 
 
 class MazeEnvRandom100x100(MazeEnv):
-    def __init__(self, enable_render=True):
+    def __init__(self, enable_render=True, **kwargs):
         super(MazeEnvRandom100x100, self).__init__(
-            maze_size=(100, 100), enable_render=enable_render
+            maze_size=(100, 100), enable_render=enable_render, **kwargs
         )
 
 
 class MazeEnvRandom10x10Plus(MazeEnv):
-    def __init__(self, enable_render=True):
+    def __init__(self, enable_render=True, **kwargs):
         super(MazeEnvRandom10x10Plus, self).__init__(
-            maze_size=(10, 10), mode="plus", enable_render=enable_render
+            maze_size=(10, 10), mode="plus", enable_render=enable_render, **kwargs
         )
 
 
 class MazeEnvRandom20x20Plus(MazeEnv):
-    def __init__(self, enable_render=True):
+    def __init__(self, enable_render=True, **kwargs):
         super(MazeEnvRandom20x20Plus, self).__init__(
-            maze_size=(20, 20), mode="plus", enable_render=enable_render
+            maze_size=(20, 20), mode="plus", enable_render=enable_render, **kwargs
         )
 
 
 class MazeEnvRandom30x30Plus(MazeEnv):
-    def __init__(self, enable_render=True):
+    def __init__(self, enable_render=True, **kwargs):
         super(MazeEnvRandom30x30Plus, self).__init__(
-            maze_size=(30, 30), mode="plus", enable_render=enable_render
+            maze_size=(30, 30), mode="plus", enable_render=enable_render, **kwargs
         )
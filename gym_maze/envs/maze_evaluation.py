@@ -0,0 +1,187 @@
+import copy
+import multiprocessing
+import os
+
+import numpy as np
+
+from collections import namedtuple
+from gym_maze.envs.maze_view_2d import Maze, find_maze_file
+from gym_maze.envs.maze_env import MazeEnv, maze_options
+from gym_maze.envs.maze_kernels import step_cells
+
+# One maze of an evaluation suite: a sample maze file, or a seeded random maze of a size and
+# mode (None or "plus"). The robot starts at the entrance (0, 0) and has to reach the goal in
+# the opposite corner, as in MazeEnv.
+MazeTask = namedtuple("MazeTask", ["name", "maze_file", "maze_size", "mode", "seed"])
+
+# The outcome of one maze: whether the goal was reached and in how many steps, the length of
+# the shortest path, and the ratio of the two (NaN if the goal was not reached).
+EpisodeResult = namedtuple("EpisodeResult", ["name", "success", "steps", "optimal", "ratio"])
+
+
+def sample_tasks():
+    """The tasks of all the sample mazes shipped with gym_maze.
+    """
+    samples = os.path.join(os.path.dirname(os.path.abspath(__file__)), "maze_samples")
+    return [
+        MazeTask(os.path.splitext(name)[0], name, None, None, None)
+        for name in sorted(os.listdir(samples))
+        if name.endswith(".npy")
+    ]
+
+
+def random_tasks(num_mazes, sizes=((10, 10), (20, 20), (30, 30)), modes=(None, "plus"), seed=0):
+    """num_mazes seeded random mazes, cycling through the sizes and then the modes.
+    """
+    tasks = []
+    for i in range(num_mazes):
+        size = tuple(sizes[i % len(sizes)])
+        mode = modes[(i // len(sizes)) % len(modes)]
+        name = "random-%dx%d%s-%d" % (size + ("-plus" if mode == "plus" else "", seed + i))
+        tasks.append(MazeTask(name, None, size, mode, seed + i))
+    return tasks
+
+
+def build_maze(task):
+    """The Maze of a task, without a MazeView2D or anything else pygame.
+    """
+    if task.maze_file:
+        return Maze(maze_cells=Maze.load_maze(find_maze_file(task.maze_file)))
+    # same generation parameters as the mazes of MazeView2D
+    return Maze(
+        maze_size=task.maze_size,
+        rand_break=0.7,
+        seed=task.seed,
+        **maze_options(task.maze_size, task.mode)
+    )
+
+
+def run_tasks(policy, tasks, max_steps=None, observation=None):
+    """Runs one episode of the policy in each maze, all the mazes stepped together.
+
+    The transition tables of the mazes are stacked into one, so a step of the whole batch is
+    one call to step_cells. The policy is called with the (B, ...) observations of all the
+    mazes and returns B actions in the order of MazeEnv.ACTION; rows of finished episodes are
+    ignored. Observations are the coordinates of the robots, or those of a copy of the
+    observation spec per maze, looked up in a per-cell table when the spec is memoryless. A
+    policy with a ``reset(batch_size)`` method is reset before the episodes start. The step
+    limit of a maze defaults to 100 steps per cell.
+    """
+    mazes = [build_maze(task) for task in tasks]
+    sizes = np.array([maze.num_cells for maze in mazes])
+    offsets = np.concatenate([[0], np.cumsum(sizes)[:-1]])
+    transitions = np.concatenate([maze.transitions + o for maze, o in zip(mazes, offsets)])
+    coords = np.concatenate([maze.index_to_cell(np.arange(maze.num_cells)) for maze in mazes])
+
+    starts = offsets.copy()
+    goals = offsets + sizes - 1
+    optimal = np.array(
+        [maze.distance_field(maze.index_to_cell(n - 1))[0] for maze, n in zip(mazes, sizes)]
+    )
+    limits = 100 * sizes if max_steps is None else np.full(len(mazes), max_steps)
+
+    # observations of memoryless specs are looked up per cell, others observed per maze
+    table = specs = None
+    if observation is not None:
+        specs = [copy.deepcopy(observation) for _ in mazes]
+        for spec, maze in zip(specs, mazes):
+            spec.reset(maze)
+        if observation.memoryless:
+            table = np.concatenate(
+                [
+                    spec.observe(maze.index_to_cell(np.arange(maze.num_cells)))
+                    for spec, maze in zip(specs, mazes)
+                ]
+            )
+
+    compass = list(Maze.COMPASS.keys())
+    action_dirs = np.array([compass.index(a) for a in MazeEnv.ACTION])
+
+    if hasattr(policy, "reset"):
+        policy.reset(len(mazes))
+    cells = starts.copy()
+    steps = np.zeros(len(mazes), dtype=np.int64)
+    active = (cells != goals) & (steps < limits)
+    while active.any():
+        if specs is None:
+            observations = coords[cells]
+        elif table is not None:
+            observations = table[cells]
+        else:
+            observations = np.stack(
+                [spec.observe(coords[cell]) for spec, cell in zip(specs, cells)]
+            )
+        actions = np.asarray(policy(observations), dtype=np.int64)
+        moved = step_cells(transitions, cells, action_dirs[actions])
+        cells = np.where(active, moved, cells)
+        steps += active
+        active = (cells != goals) & (steps < limits)
+
+    success = cells == goals
+    with np.errstate(divide="ignore", invalid="ignore"):
+        ratio = np.where(success & (optimal > 0), steps / np.maximum(optimal, 1), np.nan)
+    ratio[success & (optimal == 0)] = 1.0
+    return [
+        EpisodeResult(task.name, bool(s), int(n), int(o), float(r))
+        for task, s, n, o, r in zip(tasks, success, steps, optimal, ratio)
+    ]
+
+
+_worker_policy = None
+_worker_options = None
+
+
+def _init_worker(policy, options):
+    global _worker_policy, _worker_options
+    _worker_policy = policy
+    _worker_options = options
+
+
+def _run_chunk(tasks):
+    return run_tasks(_worker_policy, tasks, **_worker_options)
+
+
+def evaluate(
+    policy, tasks, num_workers=None, chunk_size=256, max_steps=None, observation=None, context=None
+):
+    """Evaluates the policy on every task and yields an EpisodeResult per maze, chunk by chunk.
+
+    Tasks are run by run_tasks in chunks of chunk_size mazes over a pool of num_workers
+    processes (all the CPUs by default), headless. The policy and the observation spec are
+    sent to each worker once, so they must be picklable; with num_workers=0 everything runs
+    in this process. The results of a chunk are only yielded once its longest episode is over,
+    in the order the chunks complete. Larger chunks step more mazes per call, but results
+    arrive later.
+    """
+    options = dict(max_steps=max_steps, observation=observation)
+    chunks = [tasks[i : i + chunk_size] for i in range(0, len(tasks), chunk_size)]
+    if num_workers == 0:
+        for chunk in chunks:
+            for result in run_tasks(policy, chunk, **options):
+                yield result
+        return
+
+    ctx = multiprocessing.get_context(context)
+    pool = ctx.Pool(num_workers, initializer=_init_worker, initargs=(policy, options))
+    try:
+        for results in pool.imap_unordered(_run_chunk, chunks):
+            for result in results:
+                yield result
+    finally:
+        pool.terminate()
+        pool.join()
+
+
+def summarize(results):
+    """Success rate, mean steps of the successes and mean ratio of their steps to the optimum.
+    """
+    results = list(results)
+    success = np.array([r.success for r in results], dtype=bool)
+    steps = np.array([r.steps for r in results], dtype=float)
+    ratio = np.array([r.ratio for r in results], dtype=float)
+    return dict(
+        num_mazes=len(results),
+        success_rate=float(success.mean()) if results else float("nan"),
+        mean_steps=float(steps[success].mean()) if success.any() else float("nan"),
+        mean_ratio=float(ratio[success].mean()) if success.any() else float("nan"),
+    )
@@ -0,0 +1,223 @@
+import networkx as nx
+import numpy as np
+
+
+class JunctionGraph:
+    """The maze with its corridors collapsed: moves run from a node to the next node.
+
+    Nodes are the cells where a walker has to make a decision or stop: junctions and dead ends
+    (any number of moves other than two), portal cells and their neighbours, and the extra
+    ``stops`` given, such as the goal; the other cells are corridors. For every cell and
+    direction, ``dest`` holds the cell reached by moving in that direction and then following
+    the corridor until a node, and ``length`` the number of primitive moves it took (0 when the
+    first move is blocked). The walks are built once per maze, advancing all of them together
+    one corridor cell per iteration. Corridor cells are then numbered in order along their
+    corridor, so ``set_stops`` only cuts the walks into the corridors holding a stop, and sums
+    along every walk are differences of prefix sums.
+    """
+
+    def __init__(self, maze, stops=None):
+        self.maze = maze
+        num_cells, num_dirs = maze.transitions.shape
+        transitions = maze.transitions
+        moves = transitions != np.arange(num_cells)[:, None]
+
+        self.__junctions = moves.sum(axis=1) != 2
+        # next to a portal, the way back is not the way in, so the corridor has to end there
+        offsets = np.array(list(maze.COMPASS.values()))
+        neighbours = maze.cell_to_index(maze.index_to_cell(np.arange(num_cells))[:, None] + offsets)
+        self.__junctions |= (moves & (transitions != neighbours)).any(axis=1)
+        for portal in maze.portals:
+            self.__junctions[maze.cell_to_index(portal.locations)] = True
+
+        # the two ways out of each corridor cell
+        first_two = np.argsort(~moves, axis=1, kind="stable")[:, :2]
+        self.__exits = np.take_along_axis(transitions, first_two, axis=1)
+
+        entries = np.arange(num_cells * num_dirs)
+        dest, length, _, last = self.__walk(entries, self.__junctions)
+        self.__number_corridors(first_two, dest, length, last)
+        self.__compile_walks(dest, length, last)
+        self.set_stops(stops)
+
+    def __walk(self, entries, is_node, values=None):
+        # follows the corridors from flat (cell, direction) entries to the next node
+        num_cells, num_dirs = self.maze.transitions.shape
+        prev = entries // num_dirs
+        cur = self.maze.transitions.ravel()[entries]
+        length = (cur != prev).astype(np.int64)
+        total = np.zeros(len(cur)) if values is None else np.where(length > 0, values[cur], 0.0)
+
+        active = np.flatnonzero((length > 0) & ~is_node[cur])
+        while active.size:
+            cell = cur[active]
+            out = self.__exits[cell]
+            nxt = np.where(out[:, 0] != prev[active], out[:, 0], out[:, 1])
+            prev[active] = cell
+            cur[active] = nxt
+            length[active] += 1
+            if values is not None:
+                total[active] += values[nxt]
+            # a ring of corridor cells has no node to stop at
+            active = active[~is_node[nxt] & (length[active] < num_cells)]
+        return cur, length, total, prev
+
+    def __number_corridors(self, first_two, dest, length, last):
+        num_cells, num_dirs = self.maze.transitions.shape
+        cells = np.flatnonzero(~self.__junctions)
+        ways = cells[:, None] * num_dirs + first_two[cells]
+        # rings of corridor cells are left unnumbered and walked whenever needed
+        numbered = self.__junctions[dest[ways[:, 0]]]
+        cells, ways = cells[numbered], ways[numbered]
+
+        # the two walks out of a cell stop next to the two ends of its corridor, after as many
+        # moves as cells up to the end (node included); cells are numbered from the lower end
+        ends = last[ways]
+        steps = length[ways]
+        starts, corridor = np.unique(ends.min(axis=1), return_inverse=True)
+        size = np.zeros(len(starts), dtype=np.int64)
+        size[corridor] = steps.sum(axis=1) - 1
+        first = np.cumsum(size) - size
+        self.__number = np.full(num_cells, -1, dtype=np.int64)
+        self.__number[cells] = (
+            first[corridor]
+            + np.take_along_axis(steps, ends.argmin(axis=1)[:, None], axis=1).ravel()
+            - 1
+        )
+        self.__corridor = np.full(num_cells, -1, dtype=np.int64)
+        self.__corridor[cells] = corridor
+        self.__bounds = np.stack([first, first + size - 1], axis=1)
+        self.__cells = np.empty(len(cells), dtype=np.int64)
+        self.__cells[self.__number[cells]] = cells
+
+    def __compile_walks(self, dest, length, last):
+        num_cells, num_dirs = self.maze.transitions.shape
+        into = self.maze.transitions.ravel()
+        moved = length > 0
+        number = self.__number[into]
+        corridor = np.where(moved & (number >= 0), self.__corridor[into], -1)
+
+        # a walk sums the values numbered lo to hi - 1, then the one of dest if tail is set
+        lo = np.zeros(len(into), dtype=np.int64)
+        hi = np.zeros(len(into), dtype=np.int64)
+        walked = np.flatnonzero(corridor >= 0)
+        bounds = self.__bounds[corridor[walked]]
+        forward = last[walked] == self.__cells[bounds[:, 1]]
+        lo[walked] = np.where(forward, number[walked], bounds[:, 0])
+        hi[walked] = np.where(forward, bounds[:, 1], number[walked]) + 1
+        self.__forward = np.zeros(len(into), dtype=bool)
+        self.__forward[walked] = forward
+        # into a node only the node is entered, and the walks into rings are summed by walking
+        tail = moved.copy()
+        self.__rings = np.flatnonzero(moved & (number < 0) & ~self.__junctions[into])
+        tail[self.__rings] = False
+        self.__walks = dest, length, lo, hi, tail
+
+        # the walks into each corridor, to cut them at new stops
+        order = np.argsort(corridor, kind="stable")
+        order = order[corridor[order] >= 0]
+        self.__into = order
+        self.__into_ptr = np.searchsorted(corridor[order], np.arange(len(self.__bounds) + 1))
+        self.__shape = (num_cells, num_dirs)
+
+    def set_stops(self, stops=None):
+        """Makes the cells of stops (and only them) the extra nodes, updating dest and length.
+
+        Only the walks into a corridor holding a stop are cut there, so moving the goal of a
+        maze costs as much as its corridor.
+        """
+        self.is_node = self.__junctions.copy()
+        dest, length, lo, hi, tail = (a.copy() for a in self.__walks)
+        if stops is not None:
+            stops = self.maze.cell_to_index(np.reshape(stops, (-1, 2)))
+            self.is_node[stops] = True
+            numbers = np.unique(self.__number[stops])
+            numbers = numbers[numbers >= 0]
+            corridors = np.unique(self.__corridor[self.__cells[numbers]])
+            entries = np.concatenate(
+                [self.__into[self.__into_ptr[c] : self.__into_ptr[c + 1]] for c in corridors]
+                + [np.zeros(0, dtype=np.int64)]
+            )
+
+            # a walk stops at the first stop along its corridor
+            start = self.__number[self.maze.transitions.ravel()[entries]]
+            bounds = self.__bounds[self.__corridor[self.__cells[start]]]
+            forward = self.__forward[entries]
+            ahead = np.searchsorted(numbers, start, side="left")
+            behind = np.searchsorted(numbers, start, side="right") - 1
+            stop = np.where(
+                forward,
+                numbers[np.minimum(ahead, len(numbers) - 1)],
+                numbers[np.maximum(behind, 0)],
+            )
+            cut = np.where(
+                forward,
+                (ahead < len(numbers)) & (stop <= bounds[:, 1]),
+                (behind >= 0) & (stop >= bounds[:, 0]),
+            )
+            entries, start, stop, forward = entries[cut], start[cut], stop[cut], forward[cut]
+            dest[entries] = self.__cells[stop]
+            length[entries] = np.abs(stop - start) + 1
+            hi[entries[forward]] = stop[forward] + 1
+            lo[entries[~forward]] = stop[~forward]
+            tail[entries] = False
+
+            in_rings = (self.__number[stops] < 0) & ~self.__junctions[stops]
+            if in_rings.any():
+                dest[self.__rings], length[self.__rings] = self.__walk(self.__rings, self.is_node)[
+                    :2
+                ]
+
+        self.__lo, self.__hi, self.__tail = lo, hi, tail
+        self.dest = dest.reshape(self.__shape)
+        self.length = length.reshape(self.__shape)
+        self.__graph = None
+        return self
+
+    @property
+    def nodes(self):
+        return np.flatnonzero(self.is_node)
+
+    def accumulate(self, values):
+        """Sums the per-cell ``values`` over the cells entered along every macro move.
+        """
+        values = np.asarray(values, dtype=float)
+        prefix = np.concatenate([[0.0], np.cumsum(values[self.__cells])])
+        total = prefix[self.__hi] - prefix[self.__lo]
+        total += np.where(self.__tail, values[self.dest.ravel()], 0.0)
+        if self.__rings.size:
+            total[self.__rings] = self.__walk(self.__rings, self.is_node, values)[2]
+        return total.reshape(self.__shape)
+
+    def path_rewards(self, table):
+        """Total reward of every macro move under a RewardTable, without the novelty bonus.
+
+        A blocked macro move is rewarded like a blocked primitive move.
+        """
+        arrive = self.accumulate(table.arrive)
+        leave = table.leave[:, None] + self.accumulate(table.leave) - table.leave[self.dest]
+        stay = (table.arrive - table.leave)[:, None]
+        return np.where(self.length > 0, arrive - leave, stay)
+
+    @property
+    def graph(self):
+        """The junction graph as a networkx DiGraph whose edges carry the corridor length.
+        """
+        if self.__graph is None:
+            nodes = self.nodes
+            dirs = list(self.maze.COMPASS.keys())
+            self.__graph = nx.DiGraph()
+            self.__graph.add_nodes_from(map(tuple, self.maze.index_to_cell(nodes).tolist()))
+            for d, dir in enumerate(dirs):
+                src = nodes[self.length[nodes, d] > 0]
+                dst = self.dest[src, d]
+                for u, v, w in zip(
+                    self.maze.index_to_cell(src).tolist(),
+                    self.maze.index_to_cell(dst).tolist(),
+                    self.length[src, d].tolist(),
+                ):
+                    u, v = tuple(u), tuple(v)
+                    # keep the shortest of parallel corridors
+                    if not self.__graph.has_edge(u, v) or self.__graph[u][v]["weight"] > w:
+                        self.__graph.add_edge(u, v, weight=w, dir=dir)
+        return self.__graph
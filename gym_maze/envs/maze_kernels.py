@@ -0,0 +1,506 @@
+"""Array kernels behind maze generation, distance fields, path search and batched stepping.
+
+Two backends implement the same kernels: "numba", which compiles them when numba is installed,
+and "numpy", which needs nothing else. Both return identical arrays for the same inputs; maze
+generation draws from its own 32-bit xorshift generator so that a seed gives the same maze on
+either backend. The backend is picked from the GYM_MAZE_BACKEND environment variable, else
+numba when it can be imported, and can be changed at runtime with set_backend.
+"""
+
+import heapq
+import os
+
+import numpy as np
+
+try:
+    import numba
+    from numba.extending import register_jitable
+except ImportError:
+    numba = None
+
+    def register_jitable(func):
+        return func
+
+
+BACKENDS = ("numpy", "numba")
+
+# COMPASS order of Maze: N, E, S, W
+_COMPASS = np.array([(0, -1), (1, 0), (0, 1), (-1, 0)], dtype=np.int64)
+
+
+@register_jitable
+def _xorshift32(state):
+    state ^= (state << 13) & 0xFFFFFFFF
+    state ^= state >> 17
+    state ^= (state << 5) & 0xFFFFFFFF
+    return state
+
+
+def _generate_maze_loops(neighbours_of, seed, num_breaks, opposite):
+    """Carves a perfect maze with a depth-first search, then breaks num_breaks extra walls.
+
+    Cells are flat and neighbours_of[cell, d] is the neighbour in direction d, or -1 out
+    of the maze. Walls are opened the way Maze always did: carving sets the bit of the wall
+    on the side of the new cell and breaking sets the bit on the side of the chosen cell.
+    """
+    num_cells, num_dirs = neighbours_of.shape
+
+    cells = np.zeros(num_cells, dtype=np.int64)
+    visited = np.zeros(num_cells, dtype=np.bool_)
+    stack = np.zeros(num_cells, dtype=np.int64)
+    neighbours = np.zeros(num_dirs, dtype=np.int64)
+
+    state = ((seed & 0x7FFFFFFF) * 2654435761 + 1) & 0xFFFFFFFF
+    if state == 0:
+        state = 1
+
+    state = _xorshift32(state)
+    start = state % num_cells
+    visited[start] = True
+    stack[0] = start
+    top = 1
+    while top > 0:
+        top -= 1
+        current = stack[top]
+
+        count = 0
+        for d in range(num_dirs):
+            n = neighbours_of[current, d]
+            if n >= 0 and not visited[n]:
+                neighbours[count] = d
+                count += 1
+
+        if count > 0:
+            state = _xorshift32(state)
+            d = neighbours[state % count]
+            n = neighbours_of[current, d]
+            cells[n] |= 1 << opposite[d]
+            visited[n] = True
+            stack[top] = current
+            stack[top + 1] = n
+            top += 2
+
+    # break walls of distinct random cells, trying their directions in random order
+    order = np.arange(num_cells)
+    dirs = np.arange(num_dirs)
+    for i in range(min(num_breaks, num_cells)):
+        state = _xorshift32(state)
+        j = i + state % (num_cells - i)
+        cell = order[j]
+        order[j] = order[i]
+        order[i] = cell
+
+        for k in range(num_dirs):
+            state = _xorshift32(state)
+            m = k + state % (num_dirs - k)
+            tmp = dirs[m]
+            dirs[m] = dirs[k]
+            dirs[k] = tmp
+        for k in range(num_dirs):
+            d = dirs[k]
+            n = neighbours_of[cell, d]
+            if n >= 0:
+                if ((cells[cell] >> d) & 1) == 0 and ((cells[n] >> opposite[d]) & 1) == 0:
+                    cells[cell] |= 1 << d
+                    break
+    return cells
+
+
+@register_jitable
+def _predecessors_loops(transitions):
+    # predecessors in compressed sparse row form: preds[indptr[c]:indptr[c + 1]] move into c
+    num_cells, num_dirs = transitions.shape
+    indptr = np.zeros(num_cells + 1, dtype=np.int64)
+    for c in range(num_cells):
+        for d in range(num_dirs):
+            n = transitions[c, d]
+            if n != c:
+                indptr[n + 1] += 1
+    for c in range(num_cells):
+        indptr[c + 1] += indptr[c]
+    fill = indptr[:-1].copy()
+    preds = np.zeros(indptr[num_cells], dtype=np.int64)
+    for c in range(num_cells):
+        for d in range(num_dirs):
+            n = transitions[c, d]
+            if n != c:
+                preds[fill[n]] = c
+                fill[n] += 1
+    return indptr, preds
+
+
+def _bfs_numpy(transitions, targets):
+    num_cells = transitions.shape[0]
+
+    # predecessors of each cell in compressed sparse row form
+    src = np.repeat(np.arange(num_cells), transitions.shape[1])
+    dst = transitions.ravel()
+    moved = src != dst
+    order = np.argsort(dst[moved], kind="stable")
+    preds = src[moved][order]
+    indptr = np.searchsorted(dst[moved][order], np.arange(num_cells + 1))
+
+    dist = np.full(num_cells, -1, dtype=np.int64)
+    dist[targets] = 0
+    frontier = np.unique(targets)
+    depth = 0
+    while frontier.size:
+        depth += 1
+        starts = indptr[frontier]
+        counts = indptr[frontier + 1] - starts
+        offsets = np.repeat(starts - np.cumsum(counts) + counts, counts)
+        candidates = preds[offsets + np.arange(counts.sum())]
+        frontier = np.unique(candidates[dist[candidates] < 0])
+        dist[frontier] = depth
+    return dist
+
+
+def _bfs_loops(transitions, targets):
+    num_cells = transitions.shape[0]
+    indptr, preds = _predecessors_loops(transitions)
+
+    dist = np.full(num_cells, -1, dtype=np.int64)
+    queue = np.zeros(num_cells, dtype=np.int64)
+    head = 0
+    tail = 0
+    for t in targets:
+        if dist[t] < 0:
+            dist[t] = 0
+            queue[tail] = t
+            tail += 1
+    while head < tail:
+        c = queue[head]
+        head += 1
+        for k in range(indptr[c], indptr[c + 1]):
+            p = preds[k]
+            if dist[p] < 0:
+                dist[p] = dist[c] + 1
+                queue[tail] = p
+                tail += 1
+    return dist
+
+
+def _distance_matrix_numpy(transitions, sources, targets):
+    out = np.empty((len(sources), len(targets)), dtype=np.int64)
+    for j in range(len(targets)):
+        out[:, j] = _bfs_numpy(transitions, targets[j : j + 1])[sources]
+    return out
+
+
+def _distance_matrix_loops(transitions, sources, targets):
+    num_cells = transitions.shape[0]
+    # one table of predecessors is shared by all the searches
+    indptr, preds = _predecessors_loops(transitions)
+
+    out = np.empty((sources.shape[0], targets.shape[0]), dtype=np.int64)
+    dist = np.full(num_cells, -1, dtype=np.int64)
+    queue = np.zeros(num_cells, dtype=np.int64)
+    for j in range(targets.shape[0]):
+        dist[:] = -1
+        dist[targets[j]] = 0
+        queue[0] = targets[j]
+        head = 0
+        tail = 1
+        while head < tail:
+            c = queue[head]
+            head += 1
+            for k in range(indptr[c], indptr[c + 1]):
+                p = preds[k]
+                if dist[p] < 0:
+                    dist[p] = dist[c] + 1
+                    queue[tail] = p
+                    tail += 1
+        for i in range(sources.shape[0]):
+            out[i, j] = dist[sources[i]]
+    return out
+
+
+def _bfs_from_numpy(transitions, sources):
+    dist = np.full(transitions.shape[0], -1, dtype=np.int64)
+    dist[sources] = 0
+    frontier = np.unique(sources)
+    depth = 0
+    while frontier.size:
+        depth += 1
+        candidates = np.unique(transitions[frontier])
+        frontier = candidates[dist[candidates] < 0]
+        dist[frontier] = depth
+    return dist
+
+
+def _bfs_from_loops(transitions, sources):
+    num_cells, num_dirs = transitions.shape
+    dist = np.full(num_cells, -1, dtype=np.int64)
+    queue = np.zeros(num_cells, dtype=np.int64)
+    head = 0
+    tail = 0
+    for s in sources:
+        if dist[s] < 0:
+            dist[s] = 0
+            queue[tail] = s
+            tail += 1
+    while head < tail:
+        c = queue[head]
+        head += 1
+        for d in range(num_dirs):
+            n = transitions[c, d]
+            if dist[n] < 0:
+                dist[n] = dist[c] + 1
+                queue[tail] = n
+                tail += 1
+    return dist
+
+
+def _descend_loops(transitions, field, start):
+    num_dirs = transitions.shape[1]
+    dirs = np.zeros(max(field[start], 0), dtype=np.int64)
+    cell = start
+    for i in range(dirs.shape[0]):
+        for d in range(num_dirs):
+            n = transitions[cell, d]
+            if field[n] == field[cell] - 1:
+                dirs[i] = d
+                cell = n
+                break
+    return dirs
+
+
+@register_jitable
+def _landmark_bound(u, to_landmarks, from_landmarks, goal_to, goal_from):
+    # triangle inequalities: d(u, g) >= d(u, l) - d(g, l) and d(u, g) >= d(l, g) - d(l, u)
+    bound = 0
+    for k in range(to_landmarks.shape[0]):
+        if to_landmarks[k, u] >= 0 and goal_to[k] >= 0:
+            bound = max(bound, to_landmarks[k, u] - goal_to[k])
+        if from_landmarks[k, u] >= 0 and goal_from[k] >= 0:
+            bound = max(bound, goal_from[k] - from_landmarks[k, u])
+    return bound
+
+
+def _astar_loops(
+    indptr,
+    indices,
+    weights,
+    sources,
+    source_dist,
+    exit_dist,
+    to_landmarks,
+    from_landmarks,
+    goal_to,
+    goal_from,
+):
+    num_nodes = indptr.shape[0] - 1
+    dist = np.full(num_nodes, np.iinfo(np.int64).max, dtype=np.int64)
+    pred = np.full(num_nodes, -1, dtype=np.int64)
+    bound = np.full(num_nodes, -1, dtype=np.int64)
+    best = -1
+    best_node = -1
+
+    heap = [(np.int64(0), np.int64(0))]
+    heap.pop()
+    for i in range(sources.shape[0]):
+        s = sources[i]
+        if source_dist[i] < dist[s]:
+            dist[s] = source_dist[i]
+            if bound[s] < 0:
+                bound[s] = _landmark_bound(s, to_landmarks, from_landmarks, goal_to, goal_from)
+            heapq.heappush(heap, (dist[s] + bound[s], s))
+
+    while len(heap) > 0:
+        f, u = heapq.heappop(heap)
+        if f - bound[u] > dist[u]:
+            continue
+        if best >= 0 and f >= best:
+            break
+        if exit_dist[u] >= 0 and (best < 0 or dist[u] + exit_dist[u] < best):
+            best = dist[u] + exit_dist[u]
+            best_node = u
+        for k in range(indptr[u], indptr[u + 1]):
+            v = indices[k]
+            if dist[u] + weights[k] < dist[v]:
+                dist[v] = dist[u] + weights[k]
+                pred[v] = u
+                if bound[v] < 0:
+                    bound[v] = _landmark_bound(v, to_landmarks, from_landmarks, goal_to, goal_from)
+                heapq.heappush(heap, (dist[v] + bound[v], v))
+    return best, best_node, pred
+
+
+def _step_numpy(transitions, cells, dirs):
+    return transitions[cells, dirs]
+
+
+def _step_loops(transitions, cells, dirs):
+    out = np.empty(cells.shape[0], dtype=np.int64)
+    for i in range(cells.shape[0]):
+        out[i] = transitions[cells[i], dirs[i]]
+    return out
+
+
+if numba is not None:
+    # compiled kernels are cached on disk, so only the first process to use them pays the JIT
+    _jit = numba.njit(cache=True)
+    _generate_maze_jit = _jit(_generate_maze_loops)
+    _bfs_jit = _jit(_bfs_loops)
+    _bfs_from_jit = _jit(_bfs_from_loops)
+    _distance_matrix_jit = _jit(_distance_matrix_loops)
+    _descend_jit = _jit(_descend_loops)
+    _astar_jit = _jit(_astar_loops)
+    _step_jit = _jit(_step_loops)
+
+_backend = "numpy"
+
+
+def set_backend(name):
+    """Selects the kernels used from now on: "numpy" or "numba".
+    """
+    global _backend
+    if name not in BACKENDS:
+        raise ValueError(
+            "backend cannot be %s. The only valid backends are %s." % (str(name), str(BACKENDS))
+        )
+    if name == "numba" and numba is None:
+        raise ImportError("The numba backend requires numba (pip install numba).")
+    _backend = name
+
+
+def get_backend():
+    return _backend
+
+
+set_backend(os.environ.get("GYM_MAZE_BACKEND", "numba" if numba is not None else "numpy"))
+
+
+def generate_maze(shape, seed, num_breaks=0, directions=None):
+    """Returns the maze_cells of a seeded random maze of the given shape.
+
+    directions is the (D, ndim) array of unit moves whose index is the bit of the wall; it
+    defaults to the COMPASS order of Maze (N, E, S, W) in 2D.
+    """
+    shape = tuple(int(n) for n in shape)
+    if directions is None:
+        directions = _COMPASS
+    directions = np.asarray(directions, dtype=np.int64)
+    opposite = np.array([np.flatnonzero((directions == -d).all(axis=1))[0] for d in directions])
+
+    args = (neighbour_table(shape, directions), int(seed), int(num_breaks), opposite)
+    if _backend == "numba":
+        cells = _generate_maze_jit(*args)
+    else:
+        cells = _generate_maze_loops(*args)
+    return cells.reshape(shape)
+
+
+def neighbour_table(shape, directions):
+    """(cells, D) flat index of the neighbour of every cell in every direction, -1 outside.
+    """
+    shape = np.array(shape, dtype=np.int64)
+    coords = np.indices(tuple(shape)).reshape(len(shape), -1).T
+    moved = coords[:, None, :] + np.asarray(directions, dtype=np.int64)
+    inside = ((moved >= 0) & (moved < shape)).all(axis=-1)
+    strides = np.append(np.cumprod(shape[::-1])[::-1][1:], 1)
+    return np.where(inside, moved @ strides, -1)
+
+
+def bfs(transitions, targets):
+    """Number of moves from every cell to the nearest target (-1 if unreachable).
+
+    transitions is the (cells, directions) table of Maze.transitions and targets are flat cell
+    indices.
+    """
+    targets = np.asarray(targets, dtype=np.int64).ravel()
+    if _backend == "numba":
+        return _bfs_jit(transitions, targets)
+    return _bfs_numpy(transitions, targets)
+
+
+def bfs_from(transitions, sources):
+    """Number of moves from the nearest of the sources to every cell (-1 if unreachable).
+
+    The forward counterpart of bfs: it follows the moves of transitions instead of reversing
+    them, which differs only where moves are one-way, such as through portals.
+    """
+    sources = np.asarray(sources, dtype=np.int64).ravel()
+    if _backend == "numba":
+        return _bfs_from_jit(transitions, sources)
+    return _bfs_from_numpy(transitions, sources)
+
+
+def distance_matrix(transitions, sources, targets):
+    """(sources, targets) number of moves from each source to each target, -1 if unreachable.
+
+    Runs one search per target, which is fastest on small tables such as a part of a maze.
+    """
+    sources = np.asarray(sources, dtype=np.int64).ravel()
+    targets = np.asarray(targets, dtype=np.int64).ravel()
+    if _backend == "numba":
+        return _distance_matrix_jit(transitions, sources, targets)
+    return _distance_matrix_numpy(transitions, sources, targets)
+
+
+def descend(transitions, field, start):
+    """Directions of a shortest path from start to the targets of a bfs distance field.
+
+    Returns an empty array if start is a target or cannot reach one.
+    """
+    field = np.asarray(field, dtype=np.int64)
+    if _backend == "numba":
+        return _descend_jit(transitions, field, int(start))
+    return _descend_loops(transitions, field, int(start))
+
+
+def astar(
+    indptr,
+    indices,
+    weights,
+    sources,
+    source_dist,
+    exit_dist,
+    to_landmarks=None,
+    from_landmarks=None,
+    goal_to=None,
+    goal_from=None,
+):
+    """Shortest path search over a weighted graph in compressed sparse row form.
+
+    The search starts from the sources at the given distances and ends at the node u that
+    minimizes its distance plus exit_dist[u] (ignoring nodes whose exit_dist is negative).
+    Landmarks guide it towards the goal: to_landmarks and from_landmarks are the (L, nodes)
+    distances from every node to each landmark and from each landmark to every node, goal_to
+    and goal_from the same for the goal, with -1 where unknown. Without them the search is
+    Dijkstra's. Returns that total (-1 if no exit is reachable), the node and the predecessor
+    of every node reached (-1 for the sources). The numpy backend runs the same heap-based
+    loop in plain Python.
+    """
+    if to_landmarks is None:
+        to_landmarks = from_landmarks = np.zeros((0, len(indptr) - 1), dtype=np.int64)
+        goal_to = goal_from = np.zeros(0, dtype=np.int64)
+    args = [
+        indptr,
+        indices,
+        weights,
+        sources,
+        source_dist,
+        exit_dist,
+        to_landmarks,
+        from_landmarks,
+        goal_to,
+        goal_from,
+    ]
+    args = [np.asarray(arg, dtype=np.int64) for arg in args]
+    args[3], args[4] = args[3].ravel(), args[4].ravel()
+    if _backend == "numba":
+        best, best_node, pred = _astar_jit(*args)
+    else:
+        best, best_node, pred = _astar_loops(*args)
+    return int(best), int(best_node), pred
+
+
+def step_cells(transitions, cells, dirs):
+    """Flat cell indices reached by moving each of the cells in the given direction.
+    """
+    cells = np.asarray(cells, dtype=np.int64)
+    dirs = np.broadcast_to(np.asarray(dirs, dtype=np.int64), cells.shape)
+    if _backend == "numba":
+        return _step_jit(transitions, cells.ravel(), dirs.ravel()).reshape(cells.shape)
+    return _step_numpy(transitions, cells, dirs)
@@ -0,0 +1,197 @@
+import gym
+import numpy as np
+
+from gym import spaces
+from gym.utils import seeding
+from gym_maze.envs.maze_env import MazeEnv, make_maze_view
+from gym_maze.envs.maze_reward import RewardSpec, GoalReward
+from gym_maze.envs.maze_observation import ObservationSpec
+from gym_maze.envs.maze_display import MazeDisplayMixin
+from gym_maze.envs.maze_kernels import step_cells
+
+
+def resolve_blocked_moves(cells, dests, num_cells, shared=None):
+    """Cancels the moves that would put two agents in one cell or swap two agents.
+
+    Agents that stay are never moved. Cancelling a move can block another one, so the rule is
+    applied until no conflict is left, which takes at most one pass per agent. Any number of
+    agents can be in the cells of the boolean mask ``shared``, such as the terminal cells where
+    finished agents stay.
+    """
+    dests = dests.copy()
+    agents = np.arange(len(cells))
+    occupant = np.full(num_cells, -1)
+    occupant[cells] = agents
+    while True:
+        moving = dests != cells
+        crowded = np.bincount(dests, minlength=num_cells)[dests] > 1
+        if shared is not None:
+            crowded &= ~shared[dests]
+        partner = occupant[dests]
+        swapping = (partner >= 0) & (partner != agents) & (dests[partner] == cells)
+        blocked = moving & (crowded | swapping)
+        if not blocked.any():
+            return dests
+        dests[blocked] = cells[blocked]
+
+
+class MultiAgentMazeEnv(MazeDisplayMixin, gym.Env):
+    """Several robots moving at once in one maze.
+
+    The robots are kept as an (A, 2) array of positions and moved together through the
+    transition table of the maze, so a step costs a handful of array operations whatever the
+    number of robots. Actions, rewards and done flags are arrays with one entry per robot; a
+    robot that reached a terminal cell stops moving and gets no further reward. The episode is
+    over when every robot is done.
+
+    With ``collision="none"`` robots can share cells. With ``collision="block"`` a move into a
+    cell that another robot ends up in, or that swaps two robots, is cancelled, except in
+    terminal cells, which every robot can reach. The robots then start in distinct cells.
+    """
+
+    metadata = {
+        "render.modes": ["human", "rgb_array"],
+    }
+
+    ACTION = MazeEnv.ACTION
+
+    COLLISIONS = ("none", "block")
+
+    def __init__(
+        self,
+        num_agents=2,
+        maze_file=None,
+        maze_size=None,
+        mode=None,
+        enable_render=False,
+        reward=None,
+        observation=None,
+        collision="none",
+        starts=None,
+        async_render=False,
+        render_fps=30,
+    ):
+
+        self._init_display(enable_render, async_render)
+        self.num_agents = int(num_agents)
+
+        if collision not in self.COLLISIONS:
+            raise ValueError(
+                "collision cannot be %s. The only valid rules are %s."
+                % (str(collision), str(self.COLLISIONS))
+            )
+        self.collision = collision
+
+        if reward is None:
+            reward = GoalReward()
+        if not isinstance(reward, RewardSpec):
+            raise TypeError("reward must be a RewardSpec.")
+        self.reward_spec = reward
+
+        if observation is not None and not isinstance(observation, ObservationSpec):
+            raise TypeError("observation must be an ObservationSpec.")
+        self.observation = observation
+
+        # None samples distinct random starts on every reset
+        if starts is not None:
+            starts = np.array(starts, dtype=int).reshape(self.num_agents, 2)
+            if collision == "block" and len(np.unique(starts, axis=0)) < self.num_agents:
+                raise ValueError("starts must be distinct cells with collision='block'.")
+        self.starts = starts
+
+        self.maze_view = make_maze_view(maze_file, maze_size, mode, self.enable_render)
+        self.maze_view.show_robot = False
+        self.maze = self.maze_view.maze
+        self.maze_size = self.maze_view.maze_size
+
+        # action index to COMPASS index
+        compass = list(self.maze.COMPASS.keys())
+        self.__action_dirs = np.array([compass.index(a) for a in self.ACTION])
+
+        self.action_space = spaces.MultiDiscrete([len(self.ACTION)] * self.num_agents)
+        if self.observation is None:
+            high = np.array(self.maze_size, dtype=int) - 1
+            self.observation_space = spaces.Box(
+                np.zeros((self.num_agents, 2), dtype=int),
+                np.broadcast_to(high, (self.num_agents, 2)),
+                dtype=np.int64,
+            )
+        else:
+            self.observation_space = spaces.Box(
+                0,
+                0x1F,
+                shape=(self.num_agents,) + tuple(self.observation.shape(self.maze)),
+                dtype=np.uint8,
+            )
+
+        self.reward_table = self.reward_spec.compile(self.maze, self.maze_view.goal)
+        num_free = np.count_nonzero(~self.reward_table.terminal)
+        if starts is None and collision == "block" and num_free < self.num_agents:
+            raise ValueError(
+                "The maze only has %d free cells for %d agents with collision='block'."
+                % (num_free, self.num_agents)
+            )
+        self.positions = np.zeros((self.num_agents, 2), dtype=int)
+        self.dones = np.zeros(self.num_agents, dtype=bool)
+
+        self._open_display(max_robots=self.num_agents, fps=render_fps)
+
+        self.seed()
+        self.reset()
+
+    def seed(self, seed=None):
+        self.np_random, seed = seeding.np_random(seed)
+        return [seed]
+
+    def reset(self):
+        if self.starts is None:
+            free = np.flatnonzero(~self.reward_table.terminal)
+            replace = self.collision == "none" and len(free) < self.num_agents
+            cells = self.np_random.choice(free, self.num_agents, replace=replace)
+            self.positions[:] = self.maze.index_to_cell(cells)
+        else:
+            self.positions[:] = self.starts
+        self.dones[:] = False
+        if self.viewer is not None:
+            self.viewer.publish(self.positions, goal=self.maze_view.goal)
+        self.reward_table.reset(self.num_agents)
+        if self.observation is not None:
+            self.observation.reset(self.maze, self.num_agents)
+        return self.__observe()
+
+    def step(self, actions):
+        actions = np.asarray(actions)
+        if actions.shape != (self.num_agents,):
+            raise ValueError("actions must have one entry per agent (%d)." % self.num_agents)
+
+        cells = self.maze.cell_to_index(self.positions)
+        dests = step_cells(self.maze.transitions, cells, self.__action_dirs[actions])
+        dests[self.dones] = cells[self.dones]
+        wanted = dests
+        if self.collision == "block":
+            dests = resolve_blocked_moves(
+                cells, dests, self.maze.num_cells, self.reward_table.terminal
+            )
+
+        rewards, terminal = self.reward_table(cells, dests, ~self.dones)
+        rewards = np.where(self.dones, 0.0, rewards)
+        self.dones |= terminal
+        self.positions[:] = self.maze.index_to_cell(dests)
+
+        if self.viewer is not None:
+            self.viewer.publish(self.positions)
+        if self.enable_render:
+            self.render()
+
+        info = {"blocked": dests != wanted}
+        return self.__observe(), rewards, self.dones.copy(), info
+
+    def __observe(self):
+        if self.observation is None:
+            return self.positions.copy()
+        return self.observation.observe(self.positions)
+
+    def render(self, mode="human", close=False, heatmap=None):
+        if self.enable_render and not close:
+            self.maze_view.draw_robots(self.positions)
+        return self._render(mode, close, self.positions, heatmap)
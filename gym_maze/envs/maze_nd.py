@@ -0,0 +1,184 @@
+import os
+import random
+
+import numpy as np
+
+from gym_maze.envs import maze_kernels
+
+# The directions of the walls of a 2D maze, in the order of their bits in maze_cells.
+COMPASS = {"N": (0, -1), "E": (1, 0), "S": (0, 1), "W": (-1, 0)}
+
+
+class MazeND:
+    """A maze with any number of dimensions, stored as one 2N-bit mask of open walls per cell.
+
+    Bit d of a cell is the wall in ``directions[d]``. In 2D the directions are the COMPASS
+    (N, E, S, W), which makes the 2D Maze of maze_view_2d a MazeND with portals; otherwise
+    they are -1 then +1 along each axis in turn. A wall is open if either of the two cells
+    sharing it has its bit set. Everything is held in flat arrays: cells are indexed in
+    row-major order of maze_cells and ``transitions[cell, d]`` is the cell reached by moving
+    in direction d, through a portal if there is one, so stepping any number of cells is one
+    gather.
+    """
+
+    def __init__(
+        self, maze_cells=None, maze_size=(10, 10, 10), has_loops=False, rand_break=0.5, seed=None
+    ):
+
+        self.has_loops = has_loops
+        self._rand_break = rand_break
+        self.seed = None if seed is None else int(seed)
+
+        if maze_cells is not None:
+            if not isinstance(maze_cells, (np.ndarray, np.generic)) or maze_cells.ndim < 1:
+                raise ValueError("maze_cells must be a NumPy array.")
+            self.maze_cells = maze_cells
+            self.maze_size = tuple(maze_cells.shape)
+        else:
+            if not isinstance(maze_size, (list, tuple)) or len(maze_size) < 1:
+                raise ValueError("maze_size must be a tuple with the size of each dimension.")
+            self.maze_size = tuple(int(n) for n in maze_size)
+            # only a generated maze draws a seed, so loading one leaves the random module alone
+            if self.seed is None:
+                self.seed = random.getrandbits(31)
+            self._generate_maze()
+
+        self._compile_tables()
+
+    @classmethod
+    def make_directions(cls, ndim):
+        if ndim == 2:
+            return np.array(list(COMPASS.values()), dtype=int)
+        directions = []
+        for axis in range(ndim):
+            for sign in (-1, 1):
+                direction = np.zeros(ndim, dtype=int)
+                direction[axis] = sign
+                directions.append(direction)
+        return np.array(directions)
+
+    def _generate_maze(self):
+        # carve the maze (and break random walls for loops) with the seeded kernel
+        num_breaks = 0
+        if self.has_loops:
+            num_breaks = int(round(self.num_cells * self._rand_break))
+        self.maze_cells = maze_kernels.generate_maze(
+            self.maze_size, self.seed, num_breaks, self.directions
+        )
+
+    def _compile_tables(self):
+        """Precomputes the open walls and the cell-to-cell transition table.
+
+        Cells are indexed in row-major order of ``maze_cells`` (index = x * MAZE_H + y in 2D)
+        and directions follow the order of ``directions``.
+        """
+        directions = self.directions
+        opposite = np.array([np.flatnonzero((directions == -d).all(axis=1))[0] for d in directions])
+        neighbours = maze_kernels.neighbour_table(self.maze_size, directions)
+        self.__strides = np.append(np.cumprod(self.maze_size[::-1])[::-1][1:], 1)
+
+        # a wall is open if either of the two cells sharing it has its bit set
+        cells = self.maze_cells.ravel().astype(np.int64)
+        bits = ((cells[:, None] >> np.arange(len(directions))) & 1).astype(bool)
+        inside = neighbours >= 0
+        neighbours = np.where(inside, neighbours, 0)
+        open_walls = inside & (bits | bits[neighbours, opposite])
+        self.__open_walls = open_walls.reshape(self.maze_size + (len(directions),))
+
+        # where each move ends up, including the jump through a portal
+        teleport = np.arange(self.num_cells)
+        for portal in self.portals:
+            for location in portal.locations:
+                teleport[self.cell_to_index(location)] = self.cell_to_index(
+                    portal.teleport(location)
+                )
+        here = np.arange(self.num_cells)[:, None]
+        self.__transitions = np.where(open_walls, teleport[neighbours], here)
+        self.__distance_fields = dict()
+
+    def save_maze(self, file_path):
+
+        if not isinstance(file_path, str):
+            raise TypeError("Invalid file_path. It must be a str.")
+
+        if not os.path.exists(os.path.dirname(file_path)):
+            raise ValueError("Cannot find the directory for %s." % file_path)
+
+        else:
+            np.save(file_path, self.maze_cells, allow_pickle=False, fix_imports=True)
+
+    @classmethod
+    def load_maze(cls, file_path):
+
+        if not isinstance(file_path, str):
+            raise TypeError("Invalid file_path. It must be a str.")
+
+        if not os.path.exists(file_path):
+            raise ValueError("Cannot find %s." % file_path)
+
+        else:
+            return np.load(file_path, allow_pickle=False, fix_imports=True)
+
+    def cell_to_index(self, cell):
+        """Converts coordinates, or an (..., ndim) array of them, to flat cell indices.
+        """
+        return np.asarray(cell) @ self.__strides
+
+    def index_to_cell(self, index):
+        """Converts flat cell indices back to (..., ndim) coordinates.
+        """
+        return np.asarray(index)[..., None] // self.__strides % self.maze_size
+
+    def step(self, cells, dirs):
+        """Flat cells reached by moving each of the flat cells in the direction of dirs.
+        """
+        return maze_kernels.step_cells(self.__transitions, cells, dirs)
+
+    def distance_field(self, targets):
+        """Number of moves from every cell to the nearest of the targets (-1 if unreachable).
+
+        The field is computed by the breadth-first search of maze_kernels and cached per set of
+        targets, so repeated queries for the same goal are a dictionary lookup.
+        """
+        targets = np.unique(self.cell_to_index(np.reshape(targets, (-1, self.ndim))))
+        key = tuple(targets.tolist())
+        if key not in self.__distance_fields:
+            field = maze_kernels.bfs(self.__transitions, targets)
+            field.flags.writeable = False
+            self.__distance_fields[key] = field
+        return self.__distance_fields[key]
+
+    @classmethod
+    def num_walls_broken(cls, cell):
+        """Number of walls broken in the bitmask of a cell, or in each of an array of them.
+        """
+        cell = np.asarray(cell, dtype=np.int64)
+        num_broken = np.zeros_like(cell)
+        while cell.any():
+            num_broken += cell & 1
+            cell = cell >> 1
+        return num_broken
+
+    @property
+    def directions(self):
+        return self.make_directions(len(self.maze_size))
+
+    @property
+    def ndim(self):
+        return len(self.maze_size)
+
+    @property
+    def num_cells(self):
+        return int(np.prod(self.maze_size))
+
+    @property
+    def open_walls(self):
+        return self.__open_walls
+
+    @property
+    def transitions(self):
+        return self.__transitions
+
+    @property
+    def portals(self):
+        return tuple()
@@ -0,0 +1,187 @@
+import gym
+import numpy as np
+
+from gym import spaces
+from gym.utils import seeding
+from gym_maze.envs.maze_nd import MazeND, COMPASS
+from gym_maze.envs.maze_view_2d import Maze
+from gym_maze.envs.maze_reward import RewardSpec, GoalReward
+from gym_maze.envs.maze_observation import ObservationSpec, known_bit, mask_dtype
+from gym_maze.envs.maze_render import MazeRenderer
+
+
+class MazeNDEnv(gym.Env):
+    """Headless maze environment for MazeND, from one corner of the maze to the opposite one.
+
+    Action d moves along ``maze.directions[d]``. The observation is the coordinates of the
+    robot, or the output of an ObservationSpec such as LocalWalls (the planar LineOfSight and
+    ExploredMap need a 2D maze). The reward specifications of MazeEnv apply unchanged.
+    """
+
+    metadata = {"render.modes": ["rgb_array"]}
+
+    def __init__(
+        self,
+        maze_size=(10, 10, 10),
+        maze_file=None,
+        has_loops=False,
+        seed=None,
+        reward=None,
+        observation=None,
+    ):
+
+        if maze_file:
+            self.maze = MazeND(maze_cells=MazeND.load_maze(maze_file))
+        else:
+            self.maze = MazeND(maze_size=maze_size, has_loops=has_loops, seed=seed)
+        self.maze_size = self.maze.maze_size
+
+        if reward is None:
+            reward = GoalReward()
+        if not isinstance(reward, RewardSpec):
+            raise TypeError("reward must be a RewardSpec.")
+        self.reward_spec = reward
+
+        if observation is not None and not isinstance(observation, ObservationSpec):
+            raise TypeError("observation must be an ObservationSpec.")
+        if observation is not None and observation.planar and self.maze.ndim != 2:
+            raise ValueError(
+                "%s only observes 2D mazes, not %dD ones."
+                % (type(observation).__name__, self.maze.ndim)
+            )
+        self.observation = observation
+
+        self.entrance = np.zeros(self.maze.ndim, dtype=int)
+        self.goal = np.array(self.maze_size, dtype=int) - 1
+        self.compile_reward()
+
+        self.action_space = spaces.Discrete(len(self.maze.directions))
+        if self.observation is None:
+            self.observation_space = spaces.Box(
+                np.zeros(self.maze.ndim, dtype=int), self.goal, dtype=np.int64
+            )
+        else:
+            self.observation_space = spaces.Box(
+                0,
+                2 * known_bit(self.maze) - 1,
+                shape=self.observation.shape(self.maze),
+                dtype=mask_dtype(self.maze),
+            )
+
+        self.__slice = None
+        self.seed()
+        self.reset()
+
+    def seed(self, seed=None):
+        self.np_random, seed = seeding.np_random(seed)
+        return [seed]
+
+    def reset(self):
+        self.cell = int(self.maze.cell_to_index(self.entrance))
+        self.steps = 0
+        self.done = False
+        self.reward_table.reset()
+        if self.observation is not None:
+            self.observation.reset(self.maze)
+        return self.__observe()
+
+    def step(self, action):
+        cell, reward, _ = self.reward_table.step(self.cell, action)
+        self.cell = int(cell)
+        self.steps += 1
+        self.done = bool(self.reward_table.terminal[self.cell])
+        return self.__observe(), float(reward), self.done, {}
+
+    def compile_reward(self):
+        """Compiles the reward specification into tables of the moves of the maze.
+
+        A step is then a few lookups, without converting between cells and coordinates.
+        """
+        self.reward_table = self.reward_spec.compile(self.maze, self.goal)
+        self.reward_table.compile_moves(self.maze.transitions)
+        # the coordinates of every cell
+        self.__coordinates = self.maze.index_to_cell(np.arange(self.maze.num_cells))
+        self.__coordinates.flags.writeable = False
+        return self.reward_table
+
+    def __observe(self):
+        robot = self.robot
+        if self.observation is None:
+            return robot.copy()
+        return self.observation.observe(robot)
+
+    @property
+    def robot(self):
+        return self.__coordinates[self.cell]
+
+    def render(self, mode="rgb_array", close=False, axes=(0, 1)):
+        """Draws the 2D slice of the maze through the robot along two of its axes.
+
+        The goal is marked when it lies in the slice. Only walls inside the slice are drawn,
+        so cells may look closed off where they open along the other axes.
+        """
+        if close:
+            self.__slice = None
+            return None
+        if mode != "rgb_array":
+            raise ValueError("MazeNDEnv can only render rgb_array frames.")
+
+        robot = self.robot
+        renderer = self.slice_renderer(axes, robot)
+        axes = list(axes)
+        heatmap = None
+        if (np.delete(self.goal, axes) == np.delete(robot, axes)).all():
+            heatmap = np.full(renderer.maze.maze_size, np.nan)
+            heatmap[tuple(self.goal[axes])] = 1.0
+        return renderer.frame(
+            heatmap=heatmap,
+            positions=robot[axes][None],
+            cmap=((150, 0, 0), (150, 0, 0)),
+            vmin=0.0,
+            vmax=1.0,
+            alpha=0.3,
+        )
+
+    def slice_renderer(self, axes=(0, 1), cell=None):
+        """MazeRenderer of the 2D slice through cell (the robot by default) along axes.
+
+        The slice is a 2D Maze whose x and y are the two axes; the renderer of the last slice
+        is kept, so rendering a robot moving within one slice reuses its cached image.
+        """
+        ndim = self.maze.ndim
+        if len(axes) != 2 or axes[0] == axes[1] or not all(0 <= a < ndim for a in axes):
+            raise ValueError("axes must be two different axes of the %dD maze." % ndim)
+        cell = self.robot if cell is None else np.asarray(cell, dtype=int)
+        key = (tuple(axes), tuple(np.delete(cell, list(axes)).tolist()))
+        if self.__slice is not None and self.__slice[0] == key:
+            return self.__slice[1]
+
+        # the open walls of the cells that share the other coordinates of cell
+        index = tuple(slice(None) if a in axes else int(cell[a]) for a in range(ndim))
+        open_walls = self.maze.open_walls[index]
+        if axes[0] > axes[1]:
+            open_walls = open_walls.swapaxes(0, 1)
+
+        # rebuild the COMPASS bits of the 2D cells from the directions along the two axes
+        directions = self.maze.directions
+        maze_cells = np.zeros(open_walls.shape[:2], dtype=int)
+        for bit, (dx, dy) in enumerate(COMPASS.values()):
+            direction = np.zeros(ndim, dtype=int)
+            direction[axes[0]] = dx
+            direction[axes[1]] = dy
+            d = np.flatnonzero((directions == direction).all(axis=1))[0]
+            maze_cells |= open_walls[..., d].astype(int) << bit
+
+        renderer = MazeRenderer(Maze(maze_cells=maze_cells))
+        self.__slice = (key, renderer)
+        return renderer
+
+
+class MazeNDEnvRandom10x10x10(MazeNDEnv):
+    def __init__(self, **kwargs):
+        super(MazeNDEnvRandom10x10x10, self).__init__(maze_size=(10, 10, 10), **kwargs)
+
+
+class MazeNDEnvRandom50x50x50(MazeNDEnv):
+    def __init__(self, **kwargs):
+        super(MazeNDEnvRandom50x50x50, self).__init__(maze_size=(50, 50, 50), **kwargs)
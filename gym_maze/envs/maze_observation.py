@@ -0,0 +1,239 @@
+import numpy as np
+
+# Observed cells are encoded as their open walls (N=0x1, E=0x2, S=0x4, W=0x8, matching the
+# bits of Maze.maze_cells but symmetric), with KNOWN set on every cell the agent can see.
+# Cells that are out of the maze or not seen are 0. A MazeND has 2N walls per cell, so its
+# KNOWN bit is the one after its last wall, see known_bit.
+KNOWN = 0x10
+
+
+def known_bit(maze):
+    """The KNOWN bit of the observations of a maze: KNOWN in 2D, 1 << 2N for a MazeND.
+    """
+    return 1 << maze.open_walls.shape[-1]
+
+
+def mask_dtype(maze):
+    """The smallest unsigned integer type holding the open walls and KNOWN bit of a maze.
+    """
+    return np.min_scalar_type(2 * known_bit(maze) - 1)
+
+
+def open_wall_mask(maze):
+    """Per-cell bitmask of the open walls of the maze, with both sides of a wall agreeing.
+    """
+    bits = np.left_shift(1, np.arange(maze.open_walls.shape[-1]))
+    return (maze.open_walls * bits).sum(axis=-1).astype(mask_dtype(maze))
+
+
+def _line_of_sight_crossings(dx, dy):
+    """Walls crossed by the segment between the centres of cell (0, 0) and cell (dx, dy).
+
+    Returns a list of (x, y, d): the wall on side d (COMPASS order N, E, S, W) of the cell at
+    offset (x, y). A segment that passes exactly through a corner steps along x first.
+    """
+    step_x = 1 if dx > 0 else -1
+    step_y = 1 if dy > 0 else -1
+    wall_x = 1 if dx > 0 else 3
+    wall_y = 2 if dy > 0 else 0
+
+    crossings = []
+    x, y = 0, 0
+    i, j = 0, 0
+    while i < abs(dx) or j < abs(dy):
+        # the i-th vertical wall is crossed at t = (2i + 1) / (2|dx|), likewise for y
+        if j >= abs(dy) or (i < abs(dx) and (2 * i + 1) * abs(dy) <= (2 * j + 1) * abs(dx)):
+            crossings.append((x, y, wall_x))
+            x += step_x
+            i += 1
+        else:
+            crossings.append((x, y, wall_y))
+            y += step_y
+            j += 1
+    return crossings
+
+
+class ObservationSpec:
+    """Base class of the headless observation modes accepted by MazeEnv.
+
+    ``reset(maze, batch_size)`` prepares the lookup tables of a maze and ``observe(cells)``
+    returns the observation of one (x, y) cell or of an (B, 2) batch of cells, which
+    ``observe_into(cells, out)`` writes into an existing array instead. The observation of a
+    memoryless spec depends on the cell only, so it can be tabulated per cell. A planar spec
+    only observes 2D mazes.
+    """
+
+    memoryless = True
+    planar = False
+
+    def reset(self, maze, batch_size=None):
+        self._maze = maze
+        self._batch_size = batch_size
+
+    def observe(self, cells):
+        raise NotImplementedError
+
+    def observe_into(self, cells, out):
+        out[...] = self.observe(cells)
+        return out
+
+    def shape(self, maze):
+        raise NotImplementedError
+
+
+class LocalWalls(ObservationSpec):
+    """The k x k patch of open-wall bitmasks centred on the agent.
+
+    It also works on a MazeND, where the patch is k in every dimension.
+    """
+
+    def __init__(self, k=3):
+        if k < 1 or k % 2 == 0:
+            raise ValueError("k must be a positive odd number.")
+        self.k = int(k)
+
+    def reset(self, maze, batch_size=None):
+        # the tables only depend on the maze
+        rebuild = getattr(self, "_maze", None) is not maze
+        super(LocalWalls, self).reset(maze, batch_size)
+        if not rebuild:
+            return
+        half = self.k // 2
+        size = tuple(maze.maze_size)
+        self._padded = np.zeros(tuple(n + 2 * half for n in size), dtype=mask_dtype(maze))
+        self._padded[tuple(slice(half, half + n) for n in size)] = open_wall_mask(maze) | known_bit(
+            maze
+        )
+        # the window along each axis, shaped to broadcast against the others
+        ndim = len(size)
+        self._windows = [
+            np.arange(self.k).reshape([self.k if i == axis else 1 for i in range(ndim)])
+            for axis in range(ndim)
+        ]
+
+    def observe(self, cells):
+        cells = np.asarray(cells)
+        ndim = len(self._windows)
+        index = tuple(
+            cells[(Ellipsis, axis) + (None,) * ndim] + window
+            for axis, window in enumerate(self._windows)
+        )
+        return self._padded[index]
+
+    def observe_into(self, cells, out):
+        if np.ndim(cells) != 1:
+            return super(LocalWalls, self).observe_into(cells, out)
+        # the patch of a single cell is a slice of the padded table, copied without a gather
+        out[...] = self._padded[tuple(slice(c, c + self.k) for c in cells)]
+        return out
+
+    def shape(self, maze):
+        return (self.k,) * len(maze.maze_size)
+
+
+class LineOfSight(ObservationSpec):
+    """The (2r + 1) x (2r + 1) patch of cells visible from the agent within Euclidean radius r.
+
+    A cell is visible when every wall crossed by the segment between the two cell centres is
+    open. The crossings of every offset are precomputed, so an observation is one gather over
+    the open walls and a reduction.
+    """
+
+    planar = True
+
+    def __init__(self, radius=3):
+        if radius < 0:
+            raise ValueError("radius must be non-negative.")
+        self.radius = int(radius)
+
+        r = self.radius
+        offsets = [
+            (dx, dy)
+            for dx in range(-r, r + 1)
+            for dy in range(-r, r + 1)
+            if dx * dx + dy * dy <= r * r
+        ]
+        crossings = [_line_of_sight_crossings(dx, dy) for dx, dy in offsets]
+        length = max(1, max(len(c) for c in crossings))
+
+        self._offsets = np.array(offsets, dtype=int)
+        self._crossings = np.zeros((len(offsets), length, 3), dtype=int)
+        self._unused = np.ones((len(offsets), length), dtype=bool)
+        for m, c in enumerate(crossings):
+            if c:
+                self._crossings[m, : len(c)] = c
+                self._unused[m, : len(c)] = False
+
+    def reset(self, maze, batch_size=None):
+        rebuild = getattr(self, "_maze", None) is not maze
+        super(LineOfSight, self).reset(maze, batch_size)
+        if not rebuild:
+            return
+        r = self.radius
+        width, height = maze.maze_size
+        size = (width + 2 * r, height + 2 * r)
+        self._open = np.zeros(size + (maze.open_walls.shape[-1],), dtype=bool)
+        self._open[r : r + width, r : r + height] = maze.open_walls
+        self._values = np.zeros(size, dtype=np.uint8)
+        self._values[r : r + width, r : r + height] = open_wall_mask(maze) | KNOWN
+
+    def visible(self, cells):
+        """Visibility of every offset, as (..., M) booleans, with the (..., M) padded x and y.
+        """
+        cells = np.asarray(cells) + self.radius
+        walls_open = self._open[
+            cells[..., 0, None, None] + self._crossings[:, :, 0],
+            cells[..., 1, None, None] + self._crossings[:, :, 1],
+            self._crossings[:, :, 2],
+        ]
+        x = cells[..., 0, None] + self._offsets[:, 0]
+        y = cells[..., 1, None] + self._offsets[:, 1]
+        visible = (walls_open | self._unused).all(axis=-1) & (self._values[x, y] != 0)
+        return visible, x, y
+
+    def observe(self, cells):
+        visible, x, y = self.visible(cells)
+        r = self.radius
+        patch = np.zeros(visible.shape[:-1] + (2 * r + 1, 2 * r + 1), dtype=np.uint8)
+        patch[..., self._offsets[:, 0] + r, self._offsets[:, 1] + r] = np.where(
+            visible, self._values[x, y], 0
+        )
+        return patch
+
+    def shape(self, maze):
+        return 2 * self.radius + 1, 2 * self.radius + 1
+
+
+class ExploredMap(LineOfSight):
+    """The whole maze as remembered by the agent: every cell it has seen so far this episode.
+
+    Visibility is the one of LineOfSight. The memory is kept per batch row if reset with a
+    batch_size and cleared on every reset.
+    """
+
+    memoryless = False
+
+    def reset(self, maze, batch_size=None):
+        super(ExploredMap, self).reset(maze, batch_size)
+        shape = tuple(maze.maze_size)
+        if batch_size is not None:
+            shape = (batch_size,) + shape
+        if getattr(self, "memory", None) is not None and self.memory.shape == shape:
+            self.memory[...] = 0
+        else:
+            self.memory = np.zeros(shape, dtype=np.uint8)
+
+    def observe(self, cells):
+        visible, x, y = self.visible(cells)
+        values = self._values[x, y][visible]
+        x = x[visible] - self.radius
+        y = y[visible] - self.radius
+        if self.memory.ndim == 3:
+            rows = np.broadcast_to(np.arange(visible.shape[0])[:, None], visible.shape)
+            self.memory[rows[visible], x, y] = values
+        else:
+            self.memory[x, y] = values
+        return self.memory.copy()
+
+    def shape(self, maze):
+        return tuple(maze.maze_size)
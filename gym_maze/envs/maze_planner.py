@@ -0,0 +1,235 @@
+import numpy as np
+
+from gym_maze.envs import maze_kernels
+
+
+def _dominated(weight, chunk=2**21):
+    """Marks the edges a -> b of a distance matrix that are no shorter than some a -> c -> b.
+
+    Dropping them keeps every distance: the edges a -> c and c -> b are strictly shorter, so
+    they cannot be dropped in turn for a -> b. Missing edges are marked too.
+    """
+    weight = np.where(weight > 0, weight, 2**40)
+    dominated = np.zeros(weight.shape, dtype=bool)
+    step = max(1, chunk // weight.size)
+    for i in range(0, len(weight), step):
+        through = weight[i : i + step, :, None] + weight[None, :, :]
+        dominated[i : i + step] = (through <= weight[i : i + step, None, :]).any(axis=1)
+    return dominated | (weight == 2**40)
+
+
+def _min_sum(a, b):
+    # min over the last axis of a + b, skipping the -1 of unreachable cells (-1 if none left)
+    total = np.where((a >= 0) & (b >= 0), a + b, np.iinfo(np.int64).max)
+    total = total.min(axis=-1, initial=np.iinfo(np.int64).max)
+    return np.where(total < np.iinfo(np.int64).max, total, -1)
+
+
+class HierarchicalPlanner:
+    """Exact shortest paths between any two cells of a large maze, with an HPA*-style hierarchy.
+
+    The maze is cut into clusters of cluster_size cells per side. Every cell with a move into
+    another cluster, or reached by one (through a portal too), is a node of an abstract graph
+    whose edges are those single moves plus the shortest paths between the nodes of a cluster
+    that stay inside it, precomputed once. Such a path is dropped when it is no shorter than a
+    detour through another node of the cluster, which keeps the graph sparse even in mazes
+    with many loops. Since every path is a chain of in-cluster paths between nodes, distances
+    are exact.
+
+    A query searches the cluster of the start and the cluster of the goal, then runs A* on the
+    abstract graph with lower bounds from the distances to a few landmark cells spread over
+    the maze (which, unlike coordinates, stay valid through portals). Paths are refined back
+    into primitive moves one cluster at a time.
+    """
+
+    def __init__(self, maze, cluster_size=32, num_landmarks=8):
+        if cluster_size < 1:
+            raise ValueError("cluster_size must be a positive number.")
+        if num_landmarks < 0:
+            raise ValueError("num_landmarks must be non-negative.")
+        self.maze = maze
+        self.cluster_size = int(cluster_size)
+
+        num_cells = maze.num_cells
+        transitions = maze.transitions
+        here = np.arange(num_cells)
+
+        blocks = -(-np.array(maze.maze_size) // self.cluster_size)
+        coords = maze.index_to_cell(here)
+        cluster = np.ravel_multi_index(tuple((coords // self.cluster_size).T), tuple(blocks))
+        self.num_clusters = int(np.prod(blocks))
+
+        # cells grouped by cluster, so that the table of a cluster is a contiguous slice
+        order = np.argsort(cluster, kind="stable")
+        cluster_start = np.searchsorted(cluster[order], np.arange(self.num_clusters + 1))
+        local = np.empty(num_cells, dtype=np.int64)
+        local[order] = here - cluster_start[cluster[order]]
+        inside = cluster[transitions] == cluster[:, None]
+        restricted = np.where(inside, transitions, here[:, None])
+
+        self.__cluster = cluster
+        self.__cluster_start = cluster_start
+        self.__local = local
+        self.__local_transitions = local[restricted[order]]
+
+        # the abstract nodes, ordered by cluster
+        src, dirs = np.nonzero(~inside)
+        nodes = np.unique(np.concatenate([src, transitions[src, dirs]]))
+        nodes = nodes[np.argsort(cluster[nodes], kind="stable")]
+        node_id = np.full(num_cells, -1, dtype=np.int64)
+        node_id[nodes] = np.arange(len(nodes))
+        node_start = np.searchsorted(cluster[nodes], np.arange(self.num_clusters + 1))
+
+        self.nodes = nodes
+        self.__node_start = node_start
+
+        # distances between the nodes of each cluster, without leaving it
+        intra_src, intra_dst, intra_weight = [], [], []
+        for c in np.flatnonzero(np.diff(node_start)):
+            ids = np.arange(node_start[c], node_start[c + 1])
+            table = self.__local_transitions[cluster_start[c] : cluster_start[c + 1]]
+            local_nodes = local[nodes[ids]]
+            weight = maze_kernels.distance_matrix(table, local_nodes, local_nodes)
+            a, b = np.nonzero(~_dominated(weight))
+            intra_src.append(ids[a])
+            intra_dst.append(ids[b])
+            intra_weight.append(weight[a, b])
+        intra_src = np.concatenate(intra_src or [np.zeros(0, dtype=np.int64)])
+        intra_dst = np.concatenate(intra_dst or [np.zeros(0, dtype=np.int64)])
+        intra_weight = np.concatenate(intra_weight or [np.zeros(0, dtype=np.int64)])
+
+        edge_src = np.concatenate([node_id[src], intra_src])
+        by_src = np.argsort(edge_src, kind="stable")
+        self.__indptr = np.searchsorted(edge_src[by_src], np.arange(len(nodes) + 1))
+        self.__indices = np.concatenate([node_id[transitions[src, dirs]], intra_dst])[by_src]
+        self.__weights = np.concatenate([np.ones(len(src), np.int64), intra_weight])[by_src]
+        self.__exit_dist = np.full(len(nodes), -1, dtype=np.int64)
+
+        # each landmark is the cell farthest from those picked before
+        landmarks, to_landmarks, from_landmarks = [], [], []
+        spread = maze_kernels.bfs(transitions, [0])
+        for _ in range(num_landmarks if len(nodes) else 0):
+            landmark = int(np.argmax(spread))
+            to_landmark = maze_kernels.bfs(transitions, [landmark])
+            landmarks.append(landmark)
+            to_landmarks.append(to_landmark[nodes])
+            from_landmarks.append(maze_kernels.bfs_from(transitions, [landmark])[nodes])
+            spread = np.where(to_landmark >= 0, np.minimum(spread, to_landmark), spread)
+        self.landmarks = np.array(landmarks, dtype=np.int64)
+        self.__to_landmarks = np.reshape(to_landmarks, (len(landmarks), len(nodes)))
+        self.__from_landmarks = np.reshape(from_landmarks, (len(landmarks), len(nodes)))
+
+    @property
+    def num_nodes(self):
+        return len(self.nodes)
+
+    @property
+    def num_edges(self):
+        return len(self.__indices)
+
+    def __table(self, c):
+        return self.__local_transitions[self.__cluster_start[c] : self.__cluster_start[c + 1]]
+
+    def __cluster_nodes(self, c):
+        return np.arange(self.__node_start[c], self.__node_start[c + 1])
+
+    def __search(self, start, goal):
+        start_cluster = self.__cluster[start]
+        goal_cluster = self.__cluster[goal]
+        from_start = maze_kernels.bfs_from(self.__table(start_cluster), [self.__local[start]])
+        to_goal = maze_kernels.bfs(self.__table(goal_cluster), [self.__local[goal]])
+        direct = from_start[self.__local[goal]] if start_cluster == goal_cluster else -1
+
+        sources = self.__cluster_nodes(start_cluster)
+        source_dist = from_start[self.__local[self.nodes[sources]]]
+        sources, source_dist = sources[source_dist >= 0], source_dist[source_dist >= 0]
+        exits = self.__cluster_nodes(goal_cluster)
+        self.__exit_dist[exits] = to_goal[self.__local[self.nodes[exits]]]
+        goal_to, goal_from = self.__goal_landmarks(goal, goal_cluster, exits, to_goal)
+        try:
+            best, best_node, pred = maze_kernels.astar(
+                self.__indptr,
+                self.__indices,
+                self.__weights,
+                sources,
+                source_dist,
+                self.__exit_dist,
+                self.__to_landmarks,
+                self.__from_landmarks,
+                goal_to,
+                goal_from,
+            )
+        finally:
+            self.__exit_dist[exits] = -1
+        return int(direct), best, best_node, pred, to_goal
+
+    def __goal_landmarks(self, goal, goal_cluster, exits, to_goal):
+        # a path between the goal and a landmark either stays in the goal cluster or crosses
+        # one of its nodes, so both distances are exact minimums over those nodes
+        from_goal = maze_kernels.bfs_from(self.__table(goal_cluster), [self.__local[goal]])
+        local_nodes = self.__local[self.nodes[exits]]
+        goal_to = _min_sum(from_goal[local_nodes], self.__to_landmarks[:, exits])
+        goal_from = _min_sum(to_goal[local_nodes], self.__from_landmarks[:, exits])
+
+        inside = self.__cluster[self.landmarks] == goal_cluster
+        for k in np.flatnonzero(inside):
+            for values, local_dist in (
+                (goal_to, from_goal[self.__local[self.landmarks[k]]]),
+                (goal_from, to_goal[self.__local[self.landmarks[k]]]),
+            ):
+                if local_dist >= 0 and (values[k] < 0 or local_dist < values[k]):
+                    values[k] = local_dist
+        return goal_to, goal_from
+
+    def __to_index(self, cell):
+        cell = np.asarray(cell, dtype=int)
+        if (
+            cell.shape != (len(self.maze.maze_size),)
+            or not ((cell >= 0) & (cell < self.maze.maze_size)).all()
+        ):
+            raise ValueError("%s is not a cell of the maze." % str(cell.tolist()))
+        return int(self.maze.cell_to_index(cell))
+
+    def distance(self, start, goal):
+        """Number of moves of the shortest path from the start cell to the goal cell.
+
+        Returns -1 if the goal cannot be reached.
+        """
+        direct, best, _, _, _ = self.__search(self.__to_index(start), self.__to_index(goal))
+        if direct < 0 or 0 <= best < direct:
+            return best
+        return direct
+
+    def shortest_path(self, start, goal):
+        """Directions of a shortest path from the start cell to the goal cell.
+
+        Directions index the columns of maze.transitions (COMPASS order for Maze). Returns
+        None if the goal cannot be reached.
+        """
+        start, goal = self.__to_index(start), self.__to_index(goal)
+        direct, best, node, pred, to_goal = self.__search(start, goal)
+        if direct < 0 and best < 0:
+            return None
+        if direct >= 0 and (best < 0 or direct <= best):
+            return self.__descend(start, to_goal)
+
+        chain = [node]
+        while pred[chain[-1]] >= 0:
+            chain.append(pred[chain[-1]])
+        cells = self.nodes[chain[::-1]]
+
+        segments = [self.__local_path(start, cells[0])]
+        for a, b in zip(cells[:-1], cells[1:]):
+            if self.__cluster[a] == self.__cluster[b]:
+                segments.append(self.__local_path(a, b))
+            else:
+                segments.append(np.flatnonzero(self.maze.transitions[a] == b)[:1])
+        segments.append(self.__descend(cells[-1], to_goal))
+        return np.concatenate(segments)
+
+    def __local_path(self, start, goal):
+        table = self.__table(self.__cluster[goal])
+        return self.__descend(start, maze_kernels.bfs(table, [self.__local[goal]]))
+
+    def __descend(self, start, field):
+        return maze_kernels.descend(self.__table(self.__cluster[start]), field, self.__local[start])
@@ -0,0 +1,240 @@
+import itertools
+import os
+
+import numpy as np
+import pygame
+
+# anchor colours of the default colour map, from low to high values (viridis-like)
+DEFAULT_CMAP = np.array(
+    [(68, 1, 84), (59, 82, 139), (33, 145, 140), (94, 201, 98), (253, 231, 37)], dtype=float
+)
+
+
+def colour_range(values, vmin=None, vmax=None):
+    """The range of the finite values, where vmin and vmax are not given.
+    """
+    values = np.asarray(values, dtype=float)
+    finite = np.isfinite(values)
+    if vmin is None:
+        vmin = values[finite].min() if finite.any() else 0.0
+    if vmax is None:
+        vmax = values[finite].max() if finite.any() else 1.0
+    return vmin, vmax
+
+
+def colourize(values, cmap=None, vmin=None, vmax=None):
+    """Maps an array of scalars to RGB colours by interpolating between the cmap anchors.
+
+    NaN values map to NaN colours so that callers can leave those cells untouched.
+    """
+    cmap = DEFAULT_CMAP if cmap is None else np.asarray(cmap, dtype=float)
+    values = np.asarray(values, dtype=float)
+    finite = np.isfinite(values)
+    vmin, vmax = colour_range(values, vmin, vmax)
+    scaled = (values - vmin) / max(vmax - vmin, 1e-12)
+    position = np.clip(scaled, 0.0, 1.0) * (len(cmap) - 1)
+    low = np.clip(np.floor(np.nan_to_num(position)).astype(int), 0, len(cmap) - 2)
+    weight = (position - low)[..., None]
+    colours = cmap[low] * (1.0 - weight) + cmap[low + 1] * weight
+    colours[~finite] = np.nan
+    return colours
+
+
+class MazeRenderer:
+    """Draws RGB frames of a maze with NumPy only, without a pygame display.
+
+    The image of the walls (and portals) is drawn once and cached, along with the cell of every
+    pixel. Heatmaps are coloured and blended per cell into a small table of uint8 colours,
+    which is scaled up to the frame with a single gather through the pixel cells, and robots
+    are stamped as discs with one fancy-index assignment, so the cost of a frame does not grow
+    with the number of draw calls. Frames are (H * cell_size + 1, W * cell_size + 1, 3) uint8
+    arrays indexed [y, x], like the frames of MazeView2D.
+    """
+
+    def __init__(
+        self,
+        maze,
+        cell_size=8,
+        wall_colour=(0, 0, 0),
+        background=(255, 255, 255),
+        robot_colour=(0, 0, 150),
+    ):
+        self.maze = maze
+        self.cell_size = int(cell_size)
+        self.wall_colour = np.array(wall_colour, dtype=np.uint8)
+        self.background = np.array(background, dtype=np.uint8)
+        self.robot_colour = np.array(robot_colour, dtype=np.uint8)
+
+        c = self.cell_size
+        radius = max(c / 5.0, 1.0)
+        dy, dx = np.mgrid[0:c, 0:c] - (c - 1) / 2.0
+        inside = dx**2 + dy**2 <= radius**2
+        self.__disc_rows, self.__disc_cols = np.nonzero(inside)
+
+        self.__walls = self.__draw_walls()
+        self.__pixel_cells = self.__map_pixels()
+        self.__colours = self.__draw_cells()
+        self.__image = np.take(self.__colours, self.__pixel_cells, axis=0)
+        self.__image.flags.writeable = False
+
+    def __draw_walls(self):
+        c = self.cell_size
+        W, H = self.maze.MAZE_W, self.maze.MAZE_H
+        walls = np.zeros((H * c + 1, W * c + 1), dtype=bool)
+        walls[[0, -1], :] = True
+        walls[:, [0, -1]] = True
+
+        # every wall is shared, so the east and south walls of all cells cover the inside
+        dirs = list(self.maze.COMPASS.keys())
+        span = np.arange(c + 1)
+        xs, ys = np.nonzero(~self.maze.open_walls[:, :, dirs.index("E")])
+        walls[(ys[:, None] * c + span).ravel(), np.repeat((xs + 1) * c, c + 1)] = True
+        xs, ys = np.nonzero(~self.maze.open_walls[:, :, dirs.index("S")])
+        walls[np.repeat((ys + 1) * c, c + 1), (xs[:, None] * c + span).ravel()] = True
+        return walls
+
+    def __map_pixels(self):
+        # the flat cell of every pixel, or one past the last cell for the walls
+        c = self.cell_size
+        W, H = self.maze.MAZE_W, self.maze.MAZE_H
+        ys = np.minimum(np.arange(H * c + 1) // c, H - 1)
+        xs = np.minimum(np.arange(W * c + 1) // c, W - 1)
+        pixel_cells = xs[None, :] * H + ys[:, None]
+        pixel_cells[self.__walls] = self.maze.num_cells
+        return pixel_cells
+
+    def __draw_cells(self):
+        # the colour of every cell, with a last row for the walls
+        W, H = self.maze.MAZE_W, self.maze.MAZE_H
+        colours = np.full((W, H, 3), np.nan)
+        colour_range = np.linspace(0, 255, len(self.maze.portals), dtype=int)
+        for portal, colour in zip(self.maze.portals, colour_range):
+            cells = np.array(portal.locations)
+            colours[cells[:, 0], cells[:, 1]] = ((100 - colour) % 255, colour, 0)
+
+        table = np.empty((self.maze.num_cells + 1, 3), dtype=np.uint8)
+        table[:] = self.background
+        self.__blend(table, colours.reshape(-1, 3), 160 / 255.0)
+        table[-1] = self.wall_colour
+        table.flags.writeable = False
+        return table
+
+    @staticmethod
+    def __blend(table, colours, alpha):
+        # colours are (cells, 3); NaN cells keep the colour they have in the table
+        painted = np.flatnonzero(np.isfinite(colours[:, 0]))
+        mixed = table[painted] * (1.0 - alpha) + colours[painted] * alpha
+        table[painted] = mixed.astype(np.uint8)
+
+    @property
+    def image(self):
+        return self.__image
+
+    def iter_frames(
+        self,
+        heatmaps=None,
+        positions=None,
+        colours=None,
+        cmap=None,
+        vmin=None,
+        vmax=None,
+        alpha=0.8,
+    ):
+        """Renders frames one at a time, with the arguments of frames.
+
+        heatmaps and positions can be any iterables of frames, such as generators, as long as
+        vmin and vmax are given; otherwise heatmaps have to be an array to find their range.
+        Only one frame is held at a time, so videos of any length can be written with
+        ``MazeRenderer.write_frames(renderer.iter_frames(...), directory)``.
+        """
+        if heatmaps is None and positions is None:
+            raise ValueError("One must supply heatmaps, positions or both.")
+        if heatmaps is not None and (vmin is None or vmax is None):
+            heatmaps = np.asarray(heatmaps, dtype=float)
+            vmin, vmax = colour_range(heatmaps, vmin, vmax)
+        if positions is not None:
+            colours = self.robot_colour if colours is None else np.asarray(colours, np.uint8)
+
+        if heatmaps is None:
+            heatmaps = itertools.repeat(None)
+        elif positions is None:
+            positions = itertools.repeat(None)
+        for heatmap, position in zip(heatmaps, positions):
+            yield self.__render(heatmap, position, colours, cmap, vmin, vmax, alpha)
+
+    def __render(self, heatmap, positions, colours, cmap, vmin, vmax, alpha):
+        if heatmap is None:
+            frame = self.__image.copy()
+        else:
+            heatmap = np.asarray(heatmap, dtype=float)
+            if heatmap.shape != tuple(self.maze.maze_size):
+                raise ValueError(
+                    "heatmaps must have the shape (T,) + %s." % str(self.maze.maze_size)
+                )
+            table = self.__colours.copy()
+            self.__blend(table, colourize(heatmap, cmap, vmin, vmax).reshape(-1, 3), alpha)
+            frame = np.take(table, self.__pixel_cells, axis=0)
+
+        if positions is not None:
+            positions = np.asarray(positions, dtype=int).reshape(-1, 2)
+            colours = np.broadcast_to(colours, positions.shape[:1] + (3,))
+            c = self.cell_size
+            rows = positions[:, 1, None] * c + self.__disc_rows
+            cols = positions[:, 0, None] * c + self.__disc_cols
+            frame[rows, cols] = colours[:, None]
+        return frame
+
+    def frames(
+        self,
+        heatmaps=None,
+        positions=None,
+        colours=None,
+        cmap=None,
+        vmin=None,
+        vmax=None,
+        alpha=0.8,
+    ):
+        """Renders T frames into one (T, H, W, 3) array.
+
+        heatmaps are (T, W, H) scalars (NaN cells are left blank) and positions are (T, A, 2)
+        robot cells; colours is one RGB colour or one per robot. The colour range defaults to
+        the range of all the heatmaps, so that the frames of a video share a scale. Long videos
+        are better streamed with iter_frames.
+        """
+        if heatmaps is None and positions is None:
+            raise ValueError("One must supply heatmaps, positions or both.")
+        num_frames = len(heatmaps) if heatmaps is not None else len(positions)
+        frames = np.empty((num_frames,) + self.__image.shape, dtype=np.uint8)
+        for t, frame in enumerate(
+            self.iter_frames(heatmaps, positions, colours, cmap, vmin, vmax, alpha)
+        ):
+            frames[t] = frame
+        return frames
+
+    def frame(self, heatmap=None, positions=None, **kwargs):
+        """Renders one frame from a (W, H) heatmap and/or an (A, 2) array of robot cells.
+        """
+        return next(
+            self.iter_frames(
+                heatmaps=None if heatmap is None else np.asarray(heatmap)[None],
+                positions=None if positions is None else np.asarray(positions)[None],
+                **kwargs
+            )
+        )
+
+    @staticmethod
+    def write_frames(frames, directory, prefix="frame"):
+        """Saves frames as numbered PNG files and returns their paths.
+
+        frames is a (T, H, W, 3) array or any iterable of frames, such as iter_frames, which
+        are then rendered and saved one at a time.
+        """
+        if not os.path.isdir(directory):
+            raise ValueError("Cannot find the directory %s." % directory)
+
+        paths = []
+        for i, frame in enumerate(frames):
+            path = os.path.join(directory, "%s_%06d.png" % (prefix, i))
+            pygame.image.save(pygame.surfarray.make_surface(frame.swapaxes(0, 1)), path)
+            paths.append(path)
+        return paths
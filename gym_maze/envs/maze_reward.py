@@ -0,0 +1,220 @@
+import numpy as np
+
+
+class RewardTable:
+    """Per-cell reward arrays compiled from a RewardSpec for one maze.
+
+    The reward of a move from cell ``prev`` to cell ``cur`` (flat indices) is
+    ``arrive[cur] - leave[prev]`` plus an optional visit-count novelty bonus, and the episode
+    ends when ``terminal[cur]`` is set. Both scalars and arrays of cells are accepted, so the
+    same table serves single and batched stepping. Once compile_moves has flattened the moves
+    of a maze, step looks a whole move up by its (cell, direction).
+    """
+
+    def __init__(self, num_cells):
+        self.arrive = np.zeros(num_cells)
+        self.leave = np.zeros(num_cells)
+        self.terminal = np.zeros(num_cells, dtype=bool)
+        self.novelty_scale = 0.0
+        self.visits = None
+        self.num_dirs = None
+        self.move_dest = None
+        self.move_rewards = None
+
+    def __iadd__(self, other):
+        self.arrive += other.arrive
+        self.leave += other.leave
+        self.terminal |= other.terminal
+        self.novelty_scale += other.novelty_scale
+        return self
+
+    def reset(self, batch_size=None):
+        """Clears the visit counts, kept per batch row if batch_size is given.
+        """
+        if self.novelty_scale:
+            num_cells = len(self.arrive)
+            shape = (num_cells,) if batch_size is None else (batch_size, num_cells)
+            if self.visits is not None and self.visits.shape == shape:
+                self.visits[...] = 0
+            else:
+                self.visits = np.zeros(shape, dtype=np.int64)
+        else:
+            self.visits = None
+
+    def compile_moves(self, dest, rewards=None):
+        """Flattens the cell reached by each (cell, direction) in dest and the reward of the move.
+
+        rewards defaults to the arrive and leave rewards of the moves, e.g. maze.transitions.
+        """
+        if rewards is None:
+            rewards = self.arrive[dest] - self.leave[:, None]
+        self.num_dirs = dest.shape[1]
+        self.move_dest = dest.ravel()
+        self.move_rewards = rewards.ravel()
+
+    def step(self, cell, direction):
+        """The cell reached by one move, its reward with the novelty bonus, and its flat index.
+        """
+        move = cell * self.num_dirs + direction
+        dest = self.move_dest[move]
+        reward = self.move_rewards[move]
+        if self.visits is not None:
+            reward += self.visit(dest)
+        return dest, reward, move
+
+    def visit(self, cell):
+        """Counts an arrival in a single cell and returns its novelty bonus (0 without one).
+        """
+        if self.visits is None:
+            return 0.0
+        self.visits[cell] += 1
+        return self.novelty_scale / np.sqrt(self.visits[cell])
+
+    def __call__(self, prev, cur, active=None):
+        return self.evaluate(prev, cur, self.visits, active)
+
+    def evaluate(self, prev, cur, visits=None, active=None):
+        """Reward and termination of moves from prev to cur, counting visits in ``visits``.
+
+        Only the given visit counts are updated, so passing a copy leaves the table untouched.
+        Arrivals where the boolean array ``active`` is False, such as those of finished
+        episodes, are not counted.
+        """
+        reward = self.arrive[cur] - self.leave[prev]
+        if visits is not None:
+            reward = reward + self.novelty(cur, visits, active)
+        return reward, self.terminal[cur]
+
+    def novelty(self, cur, visits, active=None):
+        """Counts the arrivals in cur and returns their novelty bonus.
+
+        Arrivals where active is False are not counted and get the bonus of their next visit.
+        """
+        counted = 1 if active is None else active
+        if visits.ndim == 2:
+            rows = np.arange(visits.shape[0])
+            visits[rows, cur] += counted
+            counts = visits[rows, cur]
+        else:
+            np.add.at(visits, cur, counted)
+            counts = visits[cur]
+        if active is not None:
+            counts = counts + ~active
+        return self.novelty_scale / np.sqrt(counts)
+
+
+class RewardSpec:
+    """Base class of the reward specifications accepted by MazeEnv.
+
+    Subclasses implement ``compile(maze, goals)`` and return a RewardTable. Specifications can
+    be combined with ``+``.
+    """
+
+    def compile(self, maze, goals):
+        raise NotImplementedError
+
+    def __add__(self, other):
+        return CompositeReward(self, other)
+
+
+class CompositeReward(RewardSpec):
+    def __init__(self, *specs):
+        self.specs = []
+        for spec in specs:
+            if isinstance(spec, CompositeReward):
+                self.specs.extend(spec.specs)
+            elif isinstance(spec, RewardSpec):
+                self.specs.append(spec)
+            else:
+                raise TypeError("spec must be a RewardSpec.")
+
+    def compile(self, maze, goals):
+        table = RewardTable(maze.num_cells)
+        for spec in self.specs:
+            table += spec.compile(maze, goals)
+        return table
+
+
+class GoalReward(RewardSpec):
+    """Pays ``reward`` and ends the episode at any of the goals, ``step_penalty`` elsewhere.
+
+    The default goals are the ones of the environment and the default step penalty is
+    -0.1 / (number of cells).
+    """
+
+    def __init__(self, reward=1.0, step_penalty=None, goals=None):
+        self.reward = reward
+        self.step_penalty = step_penalty
+        self.goals = goals
+
+    def compile(self, maze, goals):
+        goals = maze.cell_to_index(
+            np.reshape(goals if self.goals is None else self.goals, (-1, len(maze.maze_size)))
+        )
+        step_penalty = self.step_penalty
+        if step_penalty is None:
+            step_penalty = -0.1 / maze.num_cells
+
+        table = RewardTable(maze.num_cells)
+        table.arrive[:] = step_penalty
+        table.arrive[goals] = self.reward
+        table.terminal[goals] = True
+        return table
+
+
+class CellReward(RewardSpec):
+    """Adds ``reward_map[x, y]`` whenever the agent arrives in cell (x, y).
+
+    An optional boolean ``terminal_map`` of the same shape marks cells that end the episode.
+    """
+
+    def __init__(self, reward_map, terminal_map=None):
+        self.reward_map = np.asarray(reward_map, dtype=float)
+        self.terminal_map = None if terminal_map is None else np.asarray(terminal_map, dtype=bool)
+
+    def compile(self, maze, goals):
+        if self.reward_map.shape != tuple(maze.maze_size):
+            raise ValueError("reward_map must have the shape %s." % str(tuple(maze.maze_size)))
+
+        table = RewardTable(maze.num_cells)
+        table.arrive += self.reward_map.ravel()
+        if self.terminal_map is not None:
+            table.terminal |= self.terminal_map.ravel()
+        return table
+
+
+class PotentialShaping(RewardSpec):
+    """Potential-based shaping with the potential -scale * (BFS distance to the nearest goal).
+
+    Adds ``gamma * phi(cur) - phi(prev)`` to every move, which leaves the optimal policy
+    unchanged. Cells that cannot reach a goal get the potential of the farthest reachable
+    cell plus one.
+    """
+
+    def __init__(self, scale=1.0, gamma=1.0, goals=None):
+        self.scale = scale
+        self.gamma = gamma
+        self.goals = goals
+
+    def compile(self, maze, goals):
+        dist = maze.distance_field(goals if self.goals is None else self.goals).astype(float)
+        dist[dist < 0] = dist.max() + 1
+        potential = -self.scale * dist
+
+        table = RewardTable(maze.num_cells)
+        table.arrive += self.gamma * potential
+        table.leave += potential
+        return table
+
+
+class NoveltyBonus(RewardSpec):
+    """Adds ``scale / sqrt(n)`` on arrival in a cell visited n times so far this episode.
+    """
+
+    def __init__(self, scale=0.01):
+        self.scale = scale
+
+    def compile(self, maze, goals):
+        table = RewardTable(maze.num_cells)
+        table.novelty_scale = self.scale
+        return table
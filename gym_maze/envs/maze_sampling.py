@@ -0,0 +1,94 @@
+import numpy as np
+
+
+class StartGoalSampler:
+    """Base class of the start and goal samplers accepted by MazeEnv.
+
+    Subclasses implement ``sample(maze, rng)`` and return the (x, y) start and goal cells.
+    """
+
+    def sample(self, maze, rng):
+        raise NotImplementedError
+
+
+class FixedStartGoal(StartGoalSampler):
+    """Always uses the same start and goal; the defaults are the two opposite corners.
+    """
+
+    def __init__(self, start=(0, 0), goal=None):
+        self.start = start
+        self.goal = goal
+
+    def sample(self, maze, rng):
+        start = np.array(self.start, dtype=int)
+        if self.goal is None:
+            goal = np.array(maze.maze_size, dtype=int) - 1
+        else:
+            goal = np.array(self.goal, dtype=int)
+        return start, goal
+
+
+class DistanceBandSampler(StartGoalSampler):
+    """Samples a start whose shortest-path distance to the goal lies in a band.
+
+    The goal is the corner opposite to (0, 0) by default. With ``goals="random"``, a pool of
+    ``num_goals`` goals is drawn once per maze; with a list of cells, those cells are the pool.
+    Each reset picks a goal from the pool uniformly, then a start uniformly among the cells
+    ``min_distance`` to ``max_distance`` moves away from it. The distance fields of the pool
+    are computed once per maze and kept sorted, so a reset costs two binary searches. The band
+    can be changed between resets. When no cell falls inside the band, the start is drawn
+    among the reachable cells closest to it.
+    """
+
+    def __init__(self, min_distance=0, max_distance=None, goals=None, num_goals=16):
+        self.min_distance = min_distance
+        self.max_distance = max_distance
+        self.goals = goals
+        self.num_goals = num_goals
+        self.__maze = None
+        self.__pool = None
+
+    def sample(self, maze, rng):
+        if maze is not self.__maze:
+            self.__pool = self.__build_pool(maze, rng)
+            self.__maze = maze
+
+        goal, cells, dists = self.__pool[rng.choice(len(self.__pool))]
+        if dists.size == 0:
+            return maze.index_to_cell(goal), maze.index_to_cell(goal)
+
+        low = max(self.min_distance, 0)
+        high = np.inf if self.max_distance is None else self.max_distance
+        first = np.searchsorted(dists, low, side="left")
+        last = np.searchsorted(dists, high, side="right")
+        if first >= last:
+            # nothing in the band: take the reachable cells nearest to it
+            if first >= len(dists):
+                first = np.searchsorted(dists, dists[-1], side="left")
+                last = len(dists)
+            else:
+                last = np.searchsorted(dists, dists[first], side="right")
+        start = cells[first + rng.choice(last - first)]
+        return maze.index_to_cell(start), maze.index_to_cell(goal)
+
+    def __build_pool(self, maze, rng):
+        # portal cells teleport the robot away, so they make neither starts nor goals
+        usable = np.ones(maze.num_cells, dtype=bool)
+        for portal in maze.portals:
+            usable[maze.cell_to_index(portal.locations)] = False
+
+        if self.goals is None:
+            goals = [maze.cell_to_index(np.array(maze.maze_size) - 1)]
+        elif isinstance(self.goals, str) and self.goals == "random":
+            candidates = np.flatnonzero(usable)
+            goals = rng.choice(candidates, min(self.num_goals, len(candidates)), replace=False)
+        else:
+            goals = maze.cell_to_index(np.reshape(self.goals, (-1, len(maze.maze_size))))
+
+        pool = []
+        for goal in np.atleast_1d(goals):
+            field = maze.distance_field(maze.index_to_cell(goal))
+            cells = np.flatnonzero((field >= 0) & usable)
+            order = np.argsort(field[cells], kind="stable")
+            pool.append((goal, cells[order], field[cells[order]]))
+        return pool
@@ -6,6 +6,19 @@ import pygame
 import networkx as nx
 
 from itertools import product
+from gym_maze.envs.maze_nd import MazeND, COMPASS
+
+
+def find_maze_file(maze_file_path):
+    """Returns the path of a maze file, looking in maze_samples if it is not found as given.
+    """
+    if not os.path.exists(maze_file_path):
+        dir_path = os.path.dirname(os.path.abspath(__file__))
+        rel_path = os.path.join(dir_path, "maze_samples", maze_file_path)
+        if os.path.exists(rel_path):
+            return rel_path
+        raise FileExistsError("Cannot find %s." % maze_file_path)
+    return maze_file_path
 
 
 class MazeView2D:
@@ -37,14 +50,7 @@ class MazeView2D:
                 rand_break=rand_break,
             )
         else:
-            if not os.path.exists(maze_file_path):
-                dir_path = os.path.dirname(os.path.abspath(__file__))
-                rel_path = os.path.join(dir_path, "maze_samples", maze_file_path)
-                if os.path.exists(rel_path):
-                    maze_file_path = rel_path
-                else:
-                    raise FileExistsError("Cannot find %s." % maze_file_path)
-            self.__maze = Maze(maze_cells=Maze.load_maze(maze_file_path))
+            self.__maze = Maze(maze_cells=Maze.load_maze(find_maze_file(maze_file_path)))
 
         self.maze_size = self.__maze.maze_size
         if self.__enable_render is True:
@@ -59,7 +65,14 @@ class MazeView2D:
         self.__goal = np.array(self.maze_size) - np.array((1, 1))
 
         # Create the Robot
-        self.__robot = self.entrance
+        self.__robot = np.array(self.entrance)
+
+        # Extra robots drawn by draw_robots
+        self.__robots = np.zeros((0, 2), dtype=int)
+        self.show_robot = True
+
+        # reused by the egocentric crops
+        self.__crop = None
 
         if self.__enable_render is True:
             # Create a background
@@ -92,9 +105,9 @@ class MazeView2D:
             robot_img.fill((255, 255, 255, 128), None, pygame.BLEND_RGBA_MULT)
             self.background.blit(robot_img, (0, 0))
 
-    def update(self, mode="human", egocentric=False):
+    def update(self, mode="human", egocentric=False, out=None):
         try:
-            img_output = self.__view_update(mode, egocentric)
+            img_output = self.__view_update(mode, egocentric, out)
             self.__controller_update()
         except Exception as e:
             self.__game_over = True
@@ -124,20 +137,49 @@ class MazeView2D:
             self.__draw_robot(transparency=0)
 
             # move the robot
-            self.__robot += np.array(self.__maze.COMPASS[dir])
+            self.__robot += self.__maze.COMPASS[dir]
             # if it's in a portal afterward
             if self.maze.is_portal(self.robot):
-                self.__robot = np.array(
-                    self.maze.get_portal(tuple(self.robot)).teleport(tuple(self.robot))
+                self.__robot[:] = self.maze.get_portal(tuple(self.robot)).teleport(
+                    tuple(self.robot)
                 )
             self.__draw_robot(transparency=255)
 
     def reset_robot(self):
 
         self.__draw_robot(transparency=0)
-        self.__robot = np.zeros(2, dtype=int)
+        self.__robot[:] = self.__entrance
+        self.__draw_robot(transparency=255)
+
+    def set_robot(self, cell):
+        self.__draw_robot(transparency=0)
+        self.__robot[:] = self.__to_cell(cell)
         self.__draw_robot(transparency=255)
 
+    def place_robot(self, x, y):
+        """Moves the robot to (x, y) without any check, updating its coordinates in place.
+        """
+        self.__draw_robot(transparency=0)
+        self.__robot[0] = x
+        self.__robot[1] = y
+        self.__draw_robot(transparency=255)
+
+    def set_entrance(self, cell):
+        self.__draw_entrance(transparency=0)
+        self.__entrance = self.__to_cell(cell)
+        self.__draw_entrance()
+
+    def set_goal(self, cell):
+        self.__draw_goal(transparency=0)
+        self.__goal = self.__to_cell(cell)
+        self.__draw_goal()
+
+    def __to_cell(self, cell):
+        cell = np.array(cell, dtype=int)
+        if cell.shape != (2,) or not self.__maze.is_within_bound(*cell):
+            raise ValueError("cell must be a (x, y) location inside the maze.")
+        return cell
+
     def __controller_update(self):
         if not self.__game_over:
             for event in pygame.event.get():
@@ -145,13 +187,13 @@ class MazeView2D:
                     self.__game_over = True
                     self.quit_game()
 
-    def __view_update(self, mode="human", egocentric=False):
+    def __view_update(self, mode="human", egocentric=False, out=None):
         if not self.__game_over:
             # update the robot's position
             self.__draw_entrance()
             self.__draw_goal()
             self.__draw_portals()
-            self.__draw_robot()
+            self.__draw_robot(transparency=255 if self.show_robot else 0)
 
             # update the screen
             self.screen.blit(self.background, (0, 0))
@@ -165,11 +207,23 @@ class MazeView2D:
                 H = 3 * self.CELL_H + 10
                 W = 3 * self.CELL_W + 10
                 x, y, r = self.__get_robot_pose()
-                cropped = pygame.Surface((H, W))
-                cropped.blit(pygame.display.get_surface(), (0, 0), (x - H // 2, y - W // 2, H, W))
-                return np.flipud(np.rot90(pygame.surfarray.array3d(cropped)))
+                if self.__crop is None or self.__crop.get_size() != (int(H), int(W)):
+                    self.__crop = pygame.Surface((H, W))
+                self.__crop.fill((0, 0, 0))
+                self.__crop.blit(
+                    pygame.display.get_surface(), (0, 0), (x - H // 2, y - W // 2, H, W)
+                )
+                return self.__pixels(self.__crop, out)
 
-            return np.flipud(np.rot90(pygame.surfarray.array3d(pygame.display.get_surface())))
+            return self.__pixels(pygame.display.get_surface(), out)
+
+    @staticmethod
+    def __pixels(surface, out=None):
+        # surfarray indexes pixels by (x, y), images are (row, column)
+        if out is None:
+            return np.flipud(np.rot90(pygame.surfarray.array3d(surface)))
+        out[...] = pygame.surfarray.pixels3d(surface).swapaxes(0, 1)
+        return out
 
     def _randomize_cells(self):
         if not self.__enable_render:
@@ -250,21 +304,32 @@ class MazeView2D:
 
             pygame.draw.line(self.maze_layer, colour, line_head, line_tail)
 
-    def __get_robot_pose(self):
-        x = int(self.__robot[0] * self.CELL_W + self.CELL_W * 0.5 + 0.5)
-        y = int(self.__robot[1] * self.CELL_H + self.CELL_H * 0.5 + 0.5)
+    def __get_robot_pose(self, cell=None):
+        if cell is None:
+            cell = self.__robot
+        x = int(cell[0] * self.CELL_W + self.CELL_W * 0.5 + 0.5)
+        y = int(cell[1] * self.CELL_H + self.CELL_H * 0.5 + 0.5)
         r = int(min(self.CELL_W, self.CELL_H) / 5 + 0.5)
         return x, y, r
 
-    def __draw_robot(self, colour=(0, 0, 150), transparency=255):
+    def __draw_robot(self, colour=(0, 0, 150), transparency=255, cell=None):
 
         if self.__enable_render is False:
             return
 
-        x, y, r = self.__get_robot_pose()
+        x, y, r = self.__get_robot_pose(cell)
 
         pygame.draw.circle(self.maze_layer, colour + (transparency,), (x, y), r)
 
+    def draw_robots(self, cells, colour=(0, 0, 150)):
+        """Draws a robot on each of the (x, y) cells, erasing the ones of the previous call.
+        """
+        for cell in self.__robots:
+            self.__draw_robot(transparency=0, cell=cell)
+        self.__robots = np.array(cells, dtype=int).reshape(-1, 2)
+        for cell in self.__robots:
+            self.__draw_robot(colour=colour, cell=cell)
+
     def __draw_entrance(self, colour=(0, 0, 150), transparency=50):
 
         self.__colour_cell(self.entrance, colour=colour, transparency=transparency)
@@ -341,157 +406,70 @@ class MazeView2D:
         return float(self.SCREEN_H) / float(self.maze.MAZE_H)
 
 
-class Maze:
+class Maze(MazeND):
+    """A 2D MazeND with portals, whose cells are (x, y) coordinates.
+    """
 
-    COMPASS = {"N": (0, -1), "E": (1, 0), "S": (0, 1), "W": (-1, 0)}
+    COMPASS = COMPASS
 
     def __init__(
-        self, maze_cells=None, maze_size=(10, 10), has_loops=True, num_portals=0, rand_break=0.5
+        self,
+        maze_cells=None,
+        maze_size=(10, 10),
+        has_loops=True,
+        num_portals=0,
+        rand_break=0.5,
+        seed=None,
     ):
 
         # maze member variables
-        self.maze_cells = maze_cells
-        self.has_loops = has_loops
-        self._rand_break = rand_break
         self.__portals_dict = dict()
         self.__portals = []
         self.num_portals = num_portals
+        self.__graph = None
 
         # Use existing one if exists
-        if self.maze_cells is not None:
-            if (
-                isinstance(self.maze_cells, (np.ndarray, np.generic))
-                and len(self.maze_cells.shape) == 2
+        if maze_cells is not None:
+            if not (
+                isinstance(maze_cells, (np.ndarray, np.generic)) and len(maze_cells.shape) == 2
             ):
-                self.maze_size = tuple(maze_cells.shape)
-            else:
                 raise ValueError("maze_cells must be a 2D NumPy array.")
         # Otherwise, generate a random one
-        else:
-            # maze's configuration parameters
-            if not (isinstance(maze_size, (list, tuple)) and len(maze_size) == 2):
-                raise ValueError("maze_size must be a tuple: (width, height).")
-            self.maze_size = maze_size
-
-            self._generate_maze()
-
-        self._create_graph()
-
-    def save_maze(self, file_path):
-
-        if not isinstance(file_path, str):
-            raise TypeError("Invalid file_path. It must be a str.")
-
-        if not os.path.exists(os.path.dirname(file_path)):
-            raise ValueError("Cannot find the directory for %s." % file_path)
-
-        else:
-            np.save(file_path, self.maze_cells, allow_pickle=False, fix_imports=True)
-
-    @classmethod
-    def load_maze(cls, file_path):
-
-        if not isinstance(file_path, str):
-            raise TypeError("Invalid file_path. It must be a str.")
-
-        if not os.path.exists(file_path):
-            raise ValueError("Cannot find %s." % file_path)
-
-        else:
-            return np.load(file_path, allow_pickle=False, fix_imports=True)
+        elif not (isinstance(maze_size, (list, tuple)) and len(maze_size) == 2):
+            raise ValueError("maze_size must be a tuple: (width, height).")
+
+        super(Maze, self).__init__(
+            maze_cells=maze_cells,
+            maze_size=maze_size,
+            has_loops=has_loops,
+            rand_break=rand_break,
+            seed=seed,
+        )
 
     def _create_graph(self):
-        self.G = nx.Graph()
-        self.G.add_nodes_from(list(product(range(self.MAZE_W), repeat=2)))
-        for node in self.G.nodes:
-            walls = self.get_walls_status(self.maze_cells[node])
-            for direc, is_open in walls.items():
-                i, j = node
-                if is_open:
-                    if direc == "W":
-                        i -= 1
-                    elif direc == "E":
-                        i += 1
-                    elif direc == "N":
-                        j -= 1
-                    else:  # E
-                        j += 1
-                    if i >= 0 and j >= 0 and i < self.MAZE_H and j < self.MAZE_W:
-                        self.G.add_edge(node, (i, j))
+        self.__graph = nx.Graph()
+        self.__graph.add_nodes_from(product(range(self.MAZE_W), range(self.MAZE_H)))
+        # every open wall is an edge; the east and south walls of all cells cover them all
+        dirs = list(self.COMPASS.keys())
+        for dir in ("E", "S"):
+            dx, dy = self.COMPASS[dir]
+            xs, ys = np.nonzero(self.open_walls[:, :, dirs.index(dir)])
+            self.__graph.add_edges_from(
+                zip(zip(xs.tolist(), ys.tolist()), zip((xs + dx).tolist(), (ys + dy).tolist()))
+            )
 
     def _generate_maze(self):
 
-        # list of all cell locations
-        self.maze_cells = np.zeros(self.maze_size, dtype=int)
-
-        # Initializing constants and variables needed for maze generation
-        current_cell = (random.randint(0, self.MAZE_W - 1), random.randint(0, self.MAZE_H - 1))
-        num_cells_visited = 1
-        cell_stack = [current_cell]
-
-        # Continue until all cells are visited
-        while cell_stack:
-
-            # restart from a cell from the cell stack
-            current_cell = cell_stack.pop()
-            x0, y0 = current_cell
-
-            # find neighbours of the current cells that actually exist
-            neighbours = dict()
-            for dir_key, dir_val in self.COMPASS.items():
-                x1 = x0 + dir_val[0]
-                y1 = y0 + dir_val[1]
-                # if cell is within bounds
-                if 0 <= x1 < self.MAZE_W and 0 <= y1 < self.MAZE_H:
-                    # if all four walls still exist
-                    if self.all_walls_intact(self.maze_cells[x1, y1]):
-                        neighbours[dir_key] = (x1, y1)
-
-            # if there is a neighbour
-            if neighbours:
-                # select a random neighbour
-                dir = random.choice(tuple(neighbours.keys()))
-                x1, y1 = neighbours[dir]
-
-                # knock down the wall between the current cell and the selected neighbour
-                self.maze_cells[x1, y1] = self.__break_walls(
-                    self.maze_cells[x1, y1], self._get_opposite_wall(dir)
-                )
-
-                # push the current cell location to the stack
-                cell_stack.append(current_cell)
-
-                # make the this neighbour cell the current cell
-                cell_stack.append((x1, y1))
-
-                # increment the visited cell count
-                num_cells_visited += 1
-
-        if self.has_loops:
-            self.__break_random_walls(self._rand_break)
+        # carve the maze like any MazeND, then add the portals
+        super(Maze, self)._generate_maze()
+        self.maze_cells = self.maze_cells.astype(int)
 
         if self.num_portals > 0:
-            self.__set_random_portals(num_portal_sets=self.num_portals, set_size=2)
+            self.__set_random_portals(
+                num_portal_sets=self.num_portals, set_size=2, rng=random.Random(self.seed)
+            )
 
-    def __break_random_walls(self, percent):
-        # find some random cells to break
-        num_cells = int(round(self.MAZE_H * self.MAZE_W * percent))
-        cell_ids = random.sample(range(self.MAZE_W * self.MAZE_H), num_cells)
-
-        # for each of those walls
-        for cell_id in cell_ids:
-            x = cell_id % self.MAZE_H
-            y = int(cell_id / self.MAZE_H)
-
-            # randomize the compass order
-            dirs = random.sample(list(self.COMPASS.keys()), len(self.COMPASS))
-            for dir in dirs:
-                # break the wall if it's not already open
-                if self.is_breakable((x, y), dir):
-                    self.maze_cells[x, y] = self.__break_walls(self.maze_cells[x, y], dir)
-                    break
-
-    def __set_random_portals(self, num_portal_sets, set_size=2):
+    def __set_random_portals(self, num_portal_sets, set_size=2, rng=random):
         # find some random cells to break
         num_portal_sets = int(num_portal_sets)
         set_size = int(set_size)
@@ -501,13 +479,13 @@ class Maze:
         num_portal_sets = min(max_portal_sets, num_portal_sets)
 
         # the first and last cells are reserved
-        cell_ids = random.sample(
+        cell_ids = rng.sample(
             range(1, self.MAZE_W * self.MAZE_H - 1), num_portal_sets * set_size
         )
 
         for i in range(num_portal_sets):
             # sample the set_size number of sell
-            portal_cell_ids = random.sample(cell_ids, set_size)
+            portal_cell_ids = rng.sample(cell_ids, set_size)
             portal_locations = []
             for portal_cell_id in portal_cell_ids:
                 # remove the cell from the set of potential cell_ids
@@ -553,6 +531,13 @@ class Maze:
     def is_portal(self, cell):
         return tuple(cell) in self.__portals_dict
 
+    @property
+    def G(self):
+        # the networkx graph is only built when first needed
+        if self.__graph is None:
+            self._create_graph()
+        return self.__graph
+
     @property
     def portals(self):
         return tuple(self.__portals)
@@ -574,24 +559,14 @@ class Maze:
     def coords2compas(coords):
         """Converts a list of 2D coordinates to a list of compas directions.
         """
-        compas = []
-        for i in range(len(coords)-1):
-            coord_curr = coords[i]
-            coord_next = coords[i+1]
-            diff_x = coord_curr[0] - coord_next[0]
-            diff_y = coord_curr[1] - coord_next[1]
-            if diff_x != 0:
-                if diff_x == -1:
-                    action = "E"
-                else:
-                    action = "W"
-            else:
-                if diff_y == -1:
-                    action = "S"
-                else:
-                    action = "N"
-            compas.append(action)
-        return compas
+        coords = np.asarray(coords).reshape(-1, 2)
+        diff = coords[:-1] - coords[1:]
+        compas = np.where(
+            diff[:, 0] != 0,
+            np.where(diff[:, 0] == -1, "E", "W"),
+            np.where(diff[:, 1] == -1, "S", "N"),
+        )
+        return compas.tolist()
 
     @classmethod
     def get_walls_status(cls, cell):
@@ -615,18 +590,6 @@ class Maze:
             num_broken += wall_broken
         return num_broken
 
-    @classmethod
-    def __break_walls(cls, cell, dirs):
-        if "N" in dirs:
-            cell |= 0x1
-        if "E" in dirs:
-            cell |= 0x2
-        if "S" in dirs:
-            cell |= 0x4
-        if "W" in dirs:
-            cell |= 0x8
-        return cell
-
     @classmethod
     def _get_opposite_wall(cls, dirs):
 
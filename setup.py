@@ -9,4 +9,5 @@ setup(
     packages=["gym_maze", "gym_maze.envs"],
     package_data={"gym_maze.envs": ["maze_samples/*.npy"]},
     install_requires=["gym", "pygame", "numpy", "networkx"],
+    extras_require={"numba": ["numba"]},
 )
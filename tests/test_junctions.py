@@ -0,0 +1,37 @@
+import numpy as np
+import pytest
+
+from gym_maze.envs.maze_junctions import JunctionGraph
+from gym_maze.envs.maze_view_2d import Maze
+
+
+def walk(graph, cell, d, values):
+    # one macro move, primitive move by primitive move
+    transitions = graph.maze.transitions
+    prev, cur = cell, transitions[cell, d]
+    if cur == prev:
+        return cur, 0, 0.0
+    length, total = 1, values[cur]
+    while not graph.is_node[cur]:
+        nxt = [n for n in transitions[cur] if n != cur and n != prev][0]
+        prev, cur = cur, nxt
+        length += 1
+        total += values[cur]
+    return cur, length, total
+
+
+@pytest.mark.parametrize("num_portals", [0, 3])
+def test_set_stops_cuts_the_walks(num_portals):
+    maze = Maze(maze_size=(12, 12), has_loops=True, num_portals=num_portals, seed=5)
+    graph = JunctionGraph(maze)
+    rng = np.random.default_rng(0)
+    values = rng.random(maze.num_cells)
+    for num_stops in (1, 1, 3):
+        graph.set_stops(maze.index_to_cell(rng.integers(0, maze.num_cells, num_stops)))
+        totals = graph.accumulate(values)
+        for cell in range(maze.num_cells):
+            for d in range(4):
+                dest, length, total = walk(graph, cell, d, values)
+                assert graph.dest[cell, d] == dest
+                assert graph.length[cell, d] == length
+                assert totals[cell, d] == pytest.approx(total)
@@ -0,0 +1,46 @@
+import numpy as np
+import pytest
+
+from gym_maze.envs import maze_kernels
+from gym_maze.envs.maze_nd import MazeND
+
+pytest.importorskip("numba")
+
+SHAPES = [(7, 5), (4, 5, 6)]
+
+
+def on_backend(name, func, *args):
+    previous = maze_kernels.get_backend()
+    maze_kernels.set_backend(name)
+    try:
+        return func(*args)
+    finally:
+        maze_kernels.set_backend(previous)
+
+
+def assert_same_on_backends(func, *args):
+    expected = on_backend("numpy", func, *args)
+    np.testing.assert_array_equal(on_backend("numba", func, *args), expected)
+    return expected
+
+
+@pytest.mark.parametrize("shape", SHAPES)
+@pytest.mark.parametrize("num_breaks", [0, 10])
+def test_generate_maze(shape, num_breaks):
+    directions = MazeND.make_directions(len(shape))
+    for seed in range(5):
+        assert_same_on_backends(maze_kernels.generate_maze, shape, seed, num_breaks, directions)
+
+
+@pytest.mark.parametrize("shape", SHAPES)
+def test_searches_and_steps(shape):
+    maze = MazeND(maze_size=shape, has_loops=True, seed=3)
+    transitions = maze.transitions
+    targets = np.array([0, maze.num_cells - 1])
+    assert_same_on_backends(maze_kernels.bfs, transitions, targets)
+    assert_same_on_backends(maze_kernels.bfs_from, transitions, targets)
+
+    rng = np.random.default_rng(0)
+    cells = rng.integers(0, maze.num_cells, 1000)
+    dirs = rng.integers(0, len(maze.directions), 1000)
+    assert_same_on_backends(maze_kernels.step_cells, transitions, cells, dirs)
@@ -0,0 +1,48 @@
+import numpy as np
+import pytest
+
+from gym_maze.envs.maze_nd_env import MazeNDEnv
+from gym_maze.envs.maze_observation import LineOfSight, ExploredMap
+
+
+def test_render_slice_matches_transitions():
+    env = MazeNDEnv(maze_size=(3, 4, 5), seed=1)
+    for _ in range(30):
+        env.step(env.action_space.sample())
+    axes = (2, 0)
+    frame = env.render(axes=axes)
+    assert frame.dtype == np.uint8 and frame.ndim == 3
+
+    # every wall of the slice is open exactly when the move is in the transitions
+    open_walls = env.slice_renderer(axes).maze.open_walls
+    maze = env.maze
+    for x in range(maze.maze_size[axes[0]]):
+        for y in range(maze.maze_size[axes[1]]):
+            cell = env.robot.copy()
+            cell[list(axes)] = x, y
+            for bit, (dx, dy) in enumerate([(0, -1), (1, 0), (0, 1), (-1, 0)]):
+                neighbour = cell.copy()
+                neighbour[list(axes)] += dx, dy
+                inside = ((neighbour >= 0) & (neighbour < maze.maze_size)).all()
+                moved = inside and maze.cell_to_index(neighbour) in maze.transitions[
+                    maze.cell_to_index(cell)
+                ]
+                assert open_walls[x, y, bit] == moved
+
+
+def test_render_needs_two_axes():
+    env = MazeNDEnv(maze_size=(3, 3, 3), seed=0)
+    with pytest.raises(ValueError):
+        env.render(axes=(1, 1))
+    with pytest.raises(ValueError):
+        env.render(axes=(0, 3))
+
+
+@pytest.mark.parametrize("observation", [LineOfSight(2), ExploredMap(2)])
+def test_planar_observations(observation):
+    with pytest.raises(ValueError):
+        MazeNDEnv(maze_size=(4, 4, 4), observation=observation)
+
+    env = MazeNDEnv(maze_size=(6, 5), seed=0, observation=observation)
+    obs, _, _, _ = env.step(env.action_space.sample())
+    assert obs.shape == observation.shape(env.maze)
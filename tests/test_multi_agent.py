@@ -0,0 +1,48 @@
+import numpy as np
+import pytest
+
+from gym_maze.envs.maze_env import MazeEnv
+from gym_maze.envs.maze_multi_agent import MultiAgentMazeEnv
+
+
+def greedy_actions(env):
+    # every robot moves down the distance field of the goal
+    maze = env.maze
+    field = maze.distance_field(env.maze_view.goal).ravel()
+    cells = maze.cell_to_index(env.positions)
+    dirs = np.argmin(field[maze.transitions[cells]], axis=1)
+    compass = list(maze.COMPASS.keys())
+    return np.array([MazeEnv.ACTION.index(compass[d]) for d in dirs])
+
+
+def test_blocked_robots_reach_one_goal_in_turn():
+    env = MultiAgentMazeEnv(
+        2, maze_file="maze2d_5x5.npy", collision="block", starts=[(0, 0), (0, 1)]
+    )
+    env.reset()
+    finished = []
+    for _ in range(100):
+        _, _, dones, _ = env.step(greedy_actions(env))
+        finished.append(dones.copy())
+        if dones.all():
+            break
+
+    assert dones.all()
+    np.testing.assert_array_equal(env.positions, [env.maze_view.goal] * 2)
+    # the robot behind arrives after the first one, which waits in the goal
+    assert sum(f.sum() == 1 for f in finished) > 0
+
+
+def test_block_needs_distinct_starts():
+    with pytest.raises(ValueError):
+        MultiAgentMazeEnv(2, maze_file="maze2d_5x5.npy", collision="block", starts=[(1, 1)] * 2)
+
+
+def test_block_samples_distinct_starts():
+    env = MultiAgentMazeEnv(20, maze_file="maze2d_5x5.npy", collision="block")
+    for seed in range(10):
+        env.seed(seed)
+        env.reset()
+        assert len(np.unique(env.positions, axis=0)) == 20
+    with pytest.raises(ValueError):
+        MultiAgentMazeEnv(25, maze_file="maze2d_5x5.npy", collision="block")
@@ -0,0 +1,24 @@
+import numpy as np
+import pytest
+
+from gym_maze.envs.maze_planner import HierarchicalPlanner
+from gym_maze.envs.maze_view_2d import Maze
+
+
+@pytest.mark.parametrize("num_portals", [0, 4])
+def test_planner_matches_distance_field(num_portals):
+    maze = Maze(maze_size=(20, 20), has_loops=True, num_portals=num_portals, seed=7)
+    planner = HierarchicalPlanner(maze, cluster_size=6, num_landmarks=4)
+    rng = np.random.default_rng(0)
+    for _ in range(50):
+        start, goal = maze.index_to_cell(rng.integers(0, maze.num_cells, 2))
+        expected = maze.distance_field(goal).ravel()[maze.cell_to_index(start)]
+        assert planner.distance(start, goal) == expected
+
+        # following the path moves the start to the goal in exactly that many moves
+        path = planner.shortest_path(start, goal)
+        cell = maze.cell_to_index(start)
+        for d in path:
+            cell = maze.transitions[cell, d]
+        assert len(path) == expected
+        assert cell == maze.cell_to_index(goal)